@@ -0,0 +1,64 @@
+"""
+Headless VideoRecorder benchmark (no webcam or display needed).
+
+$ python bench_recorder.py synthetic:1280x720@30 --seconds 30
+$ python bench_recorder.py file:resources/sample.mp4 --codec MJPG
+"""
+import argparse
+import tempfile
+import time
+import os
+
+import numpy as np
+
+from utils import codec, timeline
+from utils.recorder import VideoRecorder
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", default="synthetic:640x480@30",
+                        help="frame source spec, see utils/frame_source.open_source")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--codec", default=codec.DEFAULT[0], choices=[c[0] for c in codec.CANDIDATES])
+    parser.add_argument("--spool", action="store_true", help="spool frames and encode after recording")
+    parser.add_argument("--roi", action="store_true", help="face-ROI recording mode (needs dlib)")
+    parser.add_argument("--output", default=None, help="keep recording files in this directory")
+    args = parser.parse_args()
+
+    video_codec = [c for c in codec.CANDIDATES if c[0] == args.codec][0]
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = args.output or tmp
+        os.makedirs(output_dir, exist_ok=True)
+
+        recorder = VideoRecorder(args.source, video_codec=video_codec, output_dir=output_dir, spool=args.spool,
+                                 roi=args.roi)
+        recorder.daemon = True
+        recorder.start()
+        recorder.execute()
+        time.sleep(args.seconds)
+        recorder.finish(timeout=30.0)
+        recorder.join()
+        if args.spool:
+            start = time.perf_counter()
+            process, _ = recorder.encodeSpool()
+            process.join()
+            print("spool encoding:   %.2f s" % (time.perf_counter() - start))
+
+        records, _ = timeline.load_timeline(os.path.join(output_dir, "video_timeline.bin"))
+        intervals = np.diff(np.asarray(records['monotonic'])) * 1000
+        duration = records['monotonic'][-1] - records['monotonic'][0] if len(records) > 1 else 0.
+
+        print("source:           %s" % args.source)
+        print("codec:            %s" % video_codec[0])
+        print("frames:           %d (dropped %d, buffer high-water %d/%d)"
+              % (len(records), recorder.buffer.dropped, recorder.buffer.high_water, recorder.buffer.capacity))
+        print("effective fps:    %.2f" % ((len(records) - 1) / duration if duration > 0 else 0.))
+        print("recorder stats:   %s" % recorder.stats.format())
+        if len(intervals) > 0:
+            print("interval (ms):    mean %.2f, std %.2f, p99 %.2f, max %.2f"
+                  % (intervals.mean(), intervals.std(), np.percentile(intervals, 99), intervals.max()))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,7 @@ from PyQt5.QtGui import *
 from pynput import mouse, keyboard
 import cv2
 
-from multiprocessing import Event, freeze_support, SimpleQueue, Value
+from multiprocessing import Event, freeze_support, parent_process
 from imutils import face_utils
 from threading import Thread
 from enum import Enum, auto
@@ -23,7 +23,15 @@ import os
 
 from typing import List, Tuple
 
-from utils import vlc, camera, sound, notification, parsing
+from utils import vlc, vlc_events, activity_log, player_events, probe_schedule, recovery, camera, sound, notification, \
+    parsing, codec, frame_source
+from utils.recorder import VideoRecorder
+from utils.multi_camera import MultiVideoRecorder
+from utils.player_monitor import PlayerMonitor
+from utils.probe_runner import ProbeRunner
+from utils.recorder_stats import LatencyStats
+from utils.response_channel import ResponseChannel
+from utils.time_label import TimeLabel
 
 
 def getResource(name):
@@ -32,230 +40,135 @@ def getResource(name):
     else:
         return "./resources/"+name
 
-def getTime(time_now, total):
-    return time_now//60, time_now % 60, total//60, total % 60
 
+class UIUpdater(QObject):
+    """
+    Updates the lecture's time label from the GUI thread. A single-shot QTimer wakes up right after the displayed
+    second changes; player events (delivered through `player_signal`, since VLC calls back on its own threads)
+    restart it on play and stop it on pause or end. The time comes from the shared PlayerMonitor's cache.
 
-class UIUpdater(QThread):
+    Once the media ended and ProbeRunner finished, the player is released and the next button enabled.
+    """
     signal = pyqtSignal()
+    player_signal = pyqtSignal(str, int)
 
-    def __init__(self, frame: QFrame, player: vlc.MediaPlayer, time_label: QLabel, time_text: str,
-                 video_label: QLabel, video_text: str, next_button: QPushButton, is_end=False):
+    def __init__(self, frame: QFrame, player: vlc.MediaPlayer, monitor: PlayerMonitor, time_label: QLabel,
+                 time_text: str, video_label: QLabel, video_text: str, next_button: QPushButton, is_end=False):
         super().__init__()
-        self.event = Event()
-        self.probeEvent = Event()
-        self.closeEvent = Event()
         self.frame = frame
         self.player = player
+        self.monitor = monitor
         self.time_text = time_text
         self.time_label = time_label
+        self.label = TimeLabel(monitor, time_text, time_label.setText)
         self.video_text = video_text
         self.video_label = video_label
         self.next_button = next_button
         # self.quiz_url = quiz_url
         self.is_end = is_end
 
+        self.active = False
+        self.started = False
+        self.stopped = False
+        self.probe_finished = False
+        self.closed = False
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+
+        self.player_signal.connect(self.onPlayerState)
+        self.monitor.subscribe(self.onPlayerEvent)
+
     def execute(self):
-        self.event.set()
+        self.active = True
 
-    def finish(self, timeout=None):
-        self.event.clear()
-        self.closeEvent.wait(timeout)
+    def finish(self):
+        self.stop()
 
     def alertProbeRunnerFinished(self):
-        self.probeEvent.set()
-
-    def run(self) -> None:
-        self.event.wait()
+        self.probe_finished = True
+        self.close()
 
-        while self.player.get_state() != vlc.State(3):
-            time.sleep(0.1)
-        total_length = self.player.get_length() // 1000
+    def onPlayerEvent(self, kind: str, value: int):
+        # Runs on a VLC thread: hand over to the GUI thread
+        self.player_signal.emit(kind, value)
 
-        while True:
-            try:
-                if not (self.player.get_state() != vlc.State(6) and self.event.is_set()):
-                    break
-            except Exception as e:
-                print(str(e), flush=True)
-                break
+    def onPlayerState(self, kind: str, value: int):
+        if not self.active or self.stopped:
+            return
+        if kind == player_events.PLAYING:
+            if not self.started:
+                self.label.start()
+                self.started = True
+            self.tick()
+        elif kind == player_events.LENGTH_CHANGED and self.started:
+            self.label.start(value)
+        elif kind == player_events.PAUSED:
+            self.timer.stop()
+        elif kind in player_events.FINAL:
+            self.stop()
+
+    def tick(self):
+        try:
+            self.timer.start(self.label.tick())
+        except Exception as e:
+            print(str(e), flush=True)
+            self.stop()
 
-            time_now = self.player.get_time()
-            self.time_label.setText(self.time_text % getTime(int(time_now / 1000), total_length))
-            time.sleep(0.5)
+    def stop(self):
+        if self.stopped:
+            return
+        self.stopped = True
+        self.timer.stop()
+        self.monitor.unsubscribe(self.onPlayerEvent)
+        self.close()
 
+    def close(self):
         # Wait for ProbeRunner
-        self.probeEvent.wait()
+        if not (self.stopped and self.probe_finished) or self.closed:
+            return
+        self.closed = True
         self.player.release()
 
         self.video_label.setText(self.video_text)
-        self.time_label.setText(self.time_text % (0, 0, 0, 0))
+        self.label.reset()
         # if self.event.is_set():  # Normal ending with video finished
         #     os.system(f"start {self.quiz_url}")
         self.next_button.setEnabled(True)
 
         if self.is_end:
             self.signal.emit()
-        self.closeEvent.set()
 
 
-class ProbeRunner(QThread):
+class ProbeRunnerSignals(QObject):
+    """
+    Qt side of utils.probe_runner.ProbeRunner, which is a plain thread: its callbacks emit these.
+    """
     signal = pyqtSignal()
     ui_signal = pyqtSignal()
 
-    def __init__(self, queue: SimpleQueue, player: vlc.MediaPlayer, video: str, is_demo=False):
-        super().__init__()
-        self.event = Event()
-        self.end_event = Event()
-        self.queue = queue
-        self.player = player
-        self.video = video
-        self.is_demo: bool = is_demo
-
-    def execute(self):
-        self.event.set()
-
-    def finish(self, timeout=None):
-        self.event.clear()
-        self.end_event.wait(timeout=timeout)
-
-    def run(self) -> None:
-        output = open("./output/probe_%s.txt" % self.video, 'w', buffering=1, encoding='UTF-8')
-
-        self.event.wait()
-
-        padding = 5000  # ms
-        interval = 40000  # ms
-        max_response = 10  # s
-
-        clock_before = 0
-        idx_before = 0
-
-        output_str = ""
-        last_probe = None
-        added = True
-
-        while self.player.get_state() != vlc.State(3):
-            time.sleep(0.1)
-
-        while True:
-            try:
-                if not (self.player.get_state() != vlc.State(6) and self.event.is_set()):
-                    break
-            except Exception as e:
-                output.write(str(e) + '\n')
-                break
-
-            time_now = self.player.get_time()
-            clock_now = time.time()
-
-            # Play ding sound
-            if (time_now - padding) // interval > idx_before:
-                sound.play(getResource("Ding-sound-effect.mp3"))
-                output_str += "%f,%f,sound\n" % (time_now, clock_now)
-                idx_before += 1
-                clock_before = clock_now
-                last_probe = None
-                added = False
-
-            # Check demo: Alert if no probing in 10 sec
-            if self.is_demo and (last_probe is None) and (not added) and (clock_now - clock_before >= max_response):
-                self.signal.emit()
-                added = True
-
-            while not self.queue.empty():
-                e: Tuple[float, str] = self.queue.get()
-                if 0. <= e[0] - clock_before < max_response:
-                    last_probe = e
-            if last_probe is not None and not added:
-                output_str += "%f,%f,probe,%s\n" % (time_now, last_probe[0], last_probe[1])
-                added = True
-
-        self.ui_signal.emit()
-        output.write(output_str)
-        output.close()
-        self.end_event.set()
-
-
-class VideoRecorder(Thread):
-    def __init__(self, cam: int):
-        super().__init__()
-        self.event = Event()
-        self.proceed_event = Event()
-        self.cam = cam
-        self.video_timeline = None
-        self.video_cap = None
-        self.video_out = None
-        self.val = Value('i', 0, lock=True)
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
-
-    def signal_handler(self, sig, frame):
-        if sig == signal.SIGINT:
-            traceback.print_stack(frame)
-            print("SIGINT FROM CHILD!", flush=True)
-
-        self.output.close()
-        if self.video_cap is not None:
-            self.video_out.release()
-
-        self.event.set()
-        sys.exit(0)
-
-    def execute(self):
-        self.event.set()
-        self.proceed_event.wait()
-
-    def finish(self, timeout=None):
-        self.event.clear()
-        self.event.wait(timeout=timeout)
-
-    def setFrameCount(self):
-        with self.val.get_lock():
-            self.val.value = 0
-
-    def getFrameCount(self):
-        return self.val.value
-
-    def run(self) -> None:
-        self.output = open("./output/video_timeline.txt", 'w', buffering=1, encoding='UTF-8')
-        if sys.platform=="darwin":
-            self.video_cap = cv2.VideoCapture(self.cam)
-        else:
-            self.video_cap = cv2.VideoCapture(self.cam, cv2.CAP_DSHOW)
-        self.video_cap.set(cv2.CAP_PROP_FPS, 30)
-        
-        size = (int(self.video_cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-                int(self.video_cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
-
-        assert(self.video_cap.isOpened())
-        
-        fourcc = cv2.VideoWriter_fourcc(*'mpeg')
-        self.video_out = cv2.VideoWriter("output/recording.mp4", fourcc, 30.0, size)
-        self.event.wait()
-        self.proceed_event.set()
-        while self.event.is_set():
-            ret, frame = self.video_cap.read()
-            curr_time = time.time()
-            if ret and frame is not None:
-                self.video_out.write(frame)
-                self.output.write("%f\n" % curr_time)
-                with self.val.get_lock():
-                    self.val.value += 1
-        self.output.write("%f,end" % time.time())
-        self.video_out.release()
-        cv2.destroyAllWindows()
-        self.output.close()
-        self.event.set()
-
 
 class ActivityRecorder(Thread):
-    def __init__(self, queue: SimpleQueue, name: str):
+    """
+    Records mouse and keyboard input during a video. The pynput callbacks only queue raw tuples; packing and
+    file writes happen in batches on two BatchWriter threads (utils/activity_log.py), so the input hooks return
+    within microseconds. The binary logs are converted to the legacy text logs when recording stops.
+    Callback durations are collected per listener and logged when recording stops.
+    """
+
+    def __init__(self, queue: ResponseChannel, name: str, log=print):
         super().__init__()
         self.event = Event()
         self.finishEvent = Event()
         self.queue = queue
         self.name = name
+        self.log = log
+        self.mouse_output = None
+        self.keyboard_output = None
+        self.mouse_callbacks = LatencyStats(activity_log.CALLBACK_EDGES_US)  # us
+        self.key_callbacks = LatencyStats(activity_log.CALLBACK_EDGES_US)  # us
         self.mouse_listener = mouse.Listener(
             on_move=self.onMouseMove,
             on_click=self.onMouseClick,
@@ -276,8 +189,8 @@ class ActivityRecorder(Thread):
             print(e)
 
         try:
-            self.keyboard_output.close()
-            self.mouse_output.close()
+            self.keyboard_output.close(timeout=1.0)
+            self.mouse_output.close(timeout=1.0)
         except Exception as e:
             print(e)
 
@@ -294,42 +207,49 @@ class ActivityRecorder(Thread):
         self.event.set()
         self.finishEvent.wait(timeout=timeout)
 
-    def key_log(self, string: str):
-        self.keyboard_output.write("%f,%s\n" % (time.time(), string))
-
-    def mouse_log(self, string: str):
-        self.mouse_output.write("%f,%s\n" % (time.time(), string))
-
     def onMouseMove(self, x, y):
-        self.mouse_log("mouse,move,%d,%d" % (x, y))
+        start = time.perf_counter()
+        self.mouse_output.append((time.time(), activity_log.MOVE, x, y))
+        self.mouse_callbacks.add((time.perf_counter() - start) * 1e6)
 
     def onMouseClick(self, x, y, button, pressed):
-        self.mouse_log("mouse,click,%s,%d,%d,%d" % (button, pressed, x, y))
+        start = time.perf_counter()
+        self.mouse_output.append((time.time(), activity_log.CLICK, x, y, button, pressed))
+        self.mouse_callbacks.add((time.perf_counter() - start) * 1e6)
 
     def onMouseScroll(self, x, y, dx, dy):
-        self.mouse_log("mouse,scroll,%d,%d,%d,%d" % (x, y, dx, dy))
+        start = time.perf_counter()
+        self.mouse_output.append((time.time(), activity_log.SCROLL, x, y, dx, dy))
+        self.mouse_callbacks.add((time.perf_counter() - start) * 1e6)
 
     def onKeyPress(self, key):
-        self.key_log("key,press,%s" % str(key))
+        start = time.perf_counter()
+        self.keyboard_output.append((time.time(), activity_log.PRESS, key))
+        self.key_callbacks.add((time.perf_counter() - start) * 1e6)
 
     def onKeyRelease(self, key):
-        self.key_log("key,release,%s" % str(key))
+        start = time.perf_counter()
+        self.keyboard_output.append((time.time(), activity_log.RELEASE, key))
         curr_time = time.time()
+        curr_mono = time.monotonic()
         if isinstance(key, keyboard.KeyCode):
             if key in [keyboard.KeyCode.from_char('f'), keyboard.KeyCode.from_char('F'), keyboard.KeyCode.from_char('ㄹ')]:
-                self.queue.put((curr_time, 'y'))
-                sound.play(getResource("Keyboard.mp3"))
+                self.queue.put(curr_time, 'y', curr_mono)
+                sound.play(getResource("Keyboard.wav"))
             elif key in [keyboard.KeyCode.from_char('n'), keyboard.KeyCode.from_char('N'), keyboard.KeyCode.from_char('ㅜ')]:
-                self.queue.put((curr_time, 'n'))
-                sound.play(getResource("Keyboard.mp3"))
+                self.queue.put(curr_time, 'n', curr_mono)
+                sound.play(getResource("Keyboard.wav"))
         elif key == keyboard.Key.space:
-            self.queue.put((curr_time, 'p'))
-            sound.play(getResource("Keyboard.mp3"))
+            self.queue.put(curr_time, 'p', curr_mono)
+            sound.play(getResource("Keyboard.wav"))
+        self.key_callbacks.add((time.perf_counter() - start) * 1e6)
 
     def run(self) -> None:
 
-        self.mouse_output = open("output/mouse_log_%s.txt" % self.name, 'w', buffering=1, encoding='UTF-8')
-        self.keyboard_output = open("output/keyboard_log_%s.txt" % self.name, 'w', buffering=1, encoding='UTF-8')
+        self.mouse_output = activity_log.BatchWriter("output/mouse_log_%s.bin" % self.name, log=self.log)
+        self.keyboard_output = activity_log.BatchWriter("output/keyboard_log_%s.bin" % self.name, log=self.log)
+        self.mouse_output.start()
+        self.keyboard_output.start()
         '''
         self.mouse_listener = mouse.Listener(
             on_move=self.onMouseMove,
@@ -358,6 +278,12 @@ class ActivityRecorder(Thread):
 
         self.mouse_output.close()
         self.keyboard_output.close()
+        activity_log.to_text("output/mouse_log_%s.bin" % self.name, "output/mouse_log_%s.txt" % self.name)
+        activity_log.to_text("output/keyboard_log_%s.bin" % self.name, "output/keyboard_log_%s.txt" % self.name)
+        self.log("activityLog,%s,mouse,%s,%s" % (self.name, self.mouse_output.format_stats(),
+                                                 self.mouse_callbacks.format()))
+        self.log("activityLog,%s,keyboard,%s,%s" % (self.name, self.keyboard_output.format_stats(),
+                                                    self.key_callbacks.format()))
 
         self.finishEvent.set()
 
@@ -429,6 +355,12 @@ class ExpApp(QMainWindow):
 
     _state = State.START
 
+    codec_probe_size = (640, 480)
+    codec_probe_fps = 30.0
+    # Probe timing, see utils/probe_schedule.py. Randomized policies are seeded per participant and video.
+    probe_policy = probe_schedule.FIXED
+    probe_interval = 40000  # ms
+
     def signal_handler(self, sig, frame):
         if sig == signal.SIGINT:
             traceback.print_stack(frame)
@@ -457,9 +389,7 @@ class ExpApp(QMainWindow):
 
         try:
             self.probeRunner.finish(timeout=5.0)
-            self.probeRunner.terminate()
-            self.updater.finish(timeout=1.0)
-            self.updater.terminate()
+            self.updater.finish()
         except Exception as e:
             self.log(str(e))
 
@@ -471,7 +401,6 @@ class ExpApp(QMainWindow):
 
         try:
             self.probeRunner.finish(timeout=5.0)
-            self.probeRunner.terminate()
         except Exception as e:
             self.log(str(e))
 
@@ -483,6 +412,12 @@ class ExpApp(QMainWindow):
         except Exception as e:
             self.log(str(e))
 
+        try:
+            if self.encoding is not None:
+                self.encoding[0].join()
+        except Exception as e:
+            self.log(str(e))
+
         try:
             self.activityRecorder.finish(timeout=3.0)
             self.activityRecorder.join()
@@ -491,6 +426,8 @@ class ExpApp(QMainWindow):
         except Exception as e:
             self.log(str(e))
 
+        sound.close(self.log)
+
         try:
             if sys.platform == "darwin":
                 output_name = os.path.join("../../../", "output_user_%s" % self.user_id.text())
@@ -525,6 +462,16 @@ class ExpApp(QMainWindow):
         # Debugging options (Disable camera setting & calibration)
         self._skip_camera = False
         self._skip_calib = False
+        # Replace the webcam, e.g. "synthetic:640x480@30" or "file:resources/face.mp4" (see frame_source.open_source)
+        self._camera_source = None
+        # Publish recorded frames on a shared-memory FrameBus (utils/frame_bus.py) for online face analysis
+        self._share_frames = False
+        # Spool raw frames during the lectures and encode after the last video (for slow machines)
+        self._spool_recording = False
+        # Encode a stabilized face crop + low-rate full frames instead of full frames
+        self._face_roi_recording = False
+        # Lab sessions: record every detected camera (e.g. an extra side view) alongside the main one
+        self._record_all_cameras = False
 
         ########### MODIFY HERE! ######################################
         self.videos = [
@@ -539,10 +486,23 @@ class ExpApp(QMainWindow):
         self.videoIndex = 0
 
         self.output = open("output/main_log.txt", 'w', buffering=1, encoding='UTF-8')
-        self.camera = camera.select_camera("output/test.png")
+        sound.init([getResource("Ding-sound-effect.wav"), getResource("Keyboard.wav")], self.log)
+        if self._camera_source is not None:
+            self.cameras = [self._camera_source]
+        else:
+            self.cameras = camera.select_cameras("output/test.png")
+        self.camera = self.cameras[0] if len(self.cameras) > 0 else None
+        self.log("cameras,%s" % self.cameras)
         if self.camera is None:
             self.log("cameraNotFound")
 
+        # Benchmark video codecs in background while the participant reads the SET_DISTRACTION screen
+        self.video_codec = codec.DEFAULT
+        self.codec_thread = Thread(target=self.select_codec)
+        self.codec_thread.daemon = True
+        if self.camera is not None:
+            self.codec_thread.start()
+
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
 
@@ -561,14 +521,15 @@ class ExpApp(QMainWindow):
 
         # initChild
         if True:
-            self.probeQueue = SimpleQueue()
+            self.probeQueue = ResponseChannel()
 
             self.probeRunner = None
             self.updater = None
 
             self.videoRecorder = None
+            self.encoding = None  # (Process, progress Value) of deferred encoding
 
-            self.activityRecorder = ActivityRecorder(self.probeQueue, "Main")
+            self.activityRecorder = ActivityRecorder(self.probeQueue, "Main", self.log)
             self.activityRecorder.daemon = True
             self.activityRecorder.start()
             self.activityRecorder.execute()  # Start recording keyboard & mouse
@@ -745,8 +706,8 @@ class ExpApp(QMainWindow):
                 beep_button.setFixedSize(758, 50)
 
                 def launch_beep():
-                    #sound.play("./resources/Ding-sound-effect.mp3")
-                    sound.play(getResource("Ding-sound-effect.mp3"))
+                    #sound.play("./resources/Ding-sound-effect.wav")
+                    sound.play(getResource("Ding-sound-effect.wav"))
                     
                 beep_button.clicked.connect(launch_beep)
 
@@ -866,10 +827,13 @@ class ExpApp(QMainWindow):
                 self.finish_label.setFont(font)
                 finish_layout.addWidget(self.finish_label, alignment=Qt.AlignHCenter)
 
-                finish_button = QPushButton('Finish\n(Please Wait)', self)
-                finish_button.setFixedSize(758, 100)
-                finish_button.clicked.connect(self.close)
-                finish_layout.addWidget(finish_button, alignment=Qt.AlignHCenter)
+                self.finish_button = QPushButton('Finish\n(Please Wait)', self)
+                self.finish_button.setFixedSize(758, 100)
+                self.finish_button.clicked.connect(self.close)
+                finish_layout.addWidget(self.finish_button, alignment=Qt.AlignHCenter)
+
+                self.encode_timer = QTimer(self)
+                self.encode_timer.timeout.connect(self.updateEncodeProgress)
 
                 self.finish_widget.setLayout(finish_layout)
 
@@ -890,6 +854,16 @@ class ExpApp(QMainWindow):
         self._state = self.State.SET_DISTRACTION
         self.widget.setCurrentWidget(self.distraction_instruction_widget)
 
+    def select_codec(self):
+        selected, results = codec.select_codec(self.codec_probe_size, self.codec_probe_fps)
+        for r in results:
+            self.log("codecProbe,%s,%.1f,%.0f" % (r.name, r.fps, r.bitrate))
+        if selected is None:
+            self.log("codecSelected,%s,default" % self.video_codec[0])
+            return
+        self.video_codec = selected
+        self.log("codecSelected,%s,%.1f,%s" % (selected.name, selected.fps, selected.fps >= self.codec_probe_fps))
+
     def proceed(self):
         """
         Every non-inherited methods are executed here.
@@ -991,10 +965,7 @@ class ExpApp(QMainWindow):
         success = self.camera is not None
 
         if success:
-            if sys.platform=="darwin":
-                cap = cv2.VideoCapture(self.camera)
-            else:
-                cap = cv2.VideoCapture(self.camera, cv2.CAP_DSHOW)
+            cap = frame_source.open_source(self.camera)
             cap.set(cv2.CAP_PROP_FPS, 30)
 
             if not cap.isOpened():
@@ -1076,11 +1047,17 @@ class ExpApp(QMainWindow):
     def camera_finished(self, frame_thread, cap):
         self.camera_running.set()
 
+        # The preview thread must stop reading before the recorder takes over the (still open) camera
         frame_thread.join()
-        cap.release()
+        if self.codec_thread.is_alive():
+            self.codec_thread.join()
         # Start recording
-        self.videoRecorder = VideoRecorder(self.camera)
-        #self.videoRecorder.video_cap = cap
+        options = dict(video_codec=self.video_codec, share_frames=self._share_frames,
+                       spool=self._spool_recording, roi=self._face_roi_recording)
+        if self._record_all_cameras and len(self.cameras) > 1:
+            self.videoRecorder = MultiVideoRecorder([cap] + self.cameras[1:], self.log, **options)
+        else:
+            self.videoRecorder = VideoRecorder(cap, self.log, **options)
         self.videoRecorder.daemon = True
         self.videoRecorder.start()
         self.videoRecorder.execute()
@@ -1120,10 +1097,13 @@ class ExpApp(QMainWindow):
             return
         if self.clicks == 0:  # First click on the point
             self.videoRecorder.setFrameCount()
+            self.videoRecorder.beginFrameRange()
             self.clicks += 1
         elif self.videoRecorder.getFrameCount() < 15:
             self.clicks += 1
         else:
+            # Captured frames (`capture` index of the video timeline) while looking at this point
+            self.log("calibrateFrames,%s,%d,%d,%f,%f" % self.videoRecorder.endFrameRange(str(self.pos)))
             self.clicks = 0
             self.pos += 1
         if self.pos >= len(self.calib_position_center):
@@ -1175,26 +1155,33 @@ class ExpApp(QMainWindow):
             self.probeRunner.finish()
 
         self.media_player = self.instance.media_player_new()
+        if self.videoRecorder is not None:
+            self.videoRecorder.newSegment(self.videos[self.videoIndex][0])
 
         self.activityRecorder.finish(timeout=5.0)  # Stop recording keyboard & mouse
         self.activityRecorder.join()
 
-        self.activityRecorder = ActivityRecorder(self.probeQueue, self.videos[self.videoIndex][0])
+        self.activityRecorder = ActivityRecorder(self.probeQueue, self.videos[self.videoIndex][0], self.log)
         self.activityRecorder.daemon = True
         self.activityRecorder.start()
 
-        self.updater = UIUpdater(self.video_frame, self.media_player, self.time_label, self.time_text,
-                                 self.video_index_label, (self.video_index_text % (self.videoIndex+2, len(self.videos))),
+        self.playerMonitor = vlc_events.VLCPlayerMonitor(self.media_player)
+        self.updater = UIUpdater(self.video_frame, self.media_player, self.playerMonitor, self.time_label,
+                                 self.time_text, self.video_index_label, (self.video_index_text % (self.videoIndex+2, len(self.videos))),
                                  self.next_button, is_end=self.videoIndex == len(self.videos)-1)
-        self.updater.daemon = True
-        self.updater.start()
         self.updater.signal.connect(self.finishVideo)
 
-        self.probeRunner = ProbeRunner(self.probeQueue, self.media_player, self.videos[self.videoIndex][0], demo)
+        video = self.videos[self.videoIndex][0]
+        schedule = probe_schedule.ProbeSchedule.build(self.probe_policy, seed="%s,%s" % (self.user_id.text(), video),
+                                                      interval=self.probe_interval)
+        self.probeSignals = ProbeRunnerSignals()
+        self.probeSignals.signal.connect(self.showDialog)
+        self.probeSignals.ui_signal.connect(self.updater.alertProbeRunnerFinished)
+        self.probeRunner = ProbeRunner(self.probeQueue, self.media_player, self.playerMonitor, video, demo, self.log,
+                                       schedule, lambda: sound.play(getResource("Ding-sound-effect.wav")),
+                                       self.probeSignals.signal.emit, self.probeSignals.ui_signal.emit)
         self.probeRunner.daemon = True
         self.probeRunner.start()
-        self.probeRunner.signal.connect(self.showDialog)
-        self.probeRunner.ui_signal.connect(self.updater.alertProbeRunnerFinished)
 
         url = parsing.get_best_url(self.videos[self.videoIndex][1])
         # url = self.videos[self.videoIndex][1]
@@ -1231,8 +1218,7 @@ class ExpApp(QMainWindow):
             else:
                 self.log("play,%s,Start" % self.videos[self.videoIndex][0])
                 
-                while(self.media_player.get_state() != vlc.State.Playing):
-                    time.sleep(0.1)
+                self.playerMonitor.wait_started()
                 self.showFullScreen()
         except Exception as e:
             self.log("play,%s,Fail,%s" % (self.videos[self.videoIndex][0], str(e)))
@@ -1262,16 +1248,50 @@ class ExpApp(QMainWindow):
     @proceedFunction(State.MAIN_VIDEO, State.FINISH)
     def finishVideo(self):
         self.probeRunner.finish(timeout=5.0)
-        self.probeRunner.terminate()
-        self.updater.terminate()
+        self.updater.finish()
         return
 
     def final(self):
         self.finish_label.setText(self.finish_text)
         self.widget.setCurrentWidget(self.finish_widget)
 
+        if self.videoRecorder is not None and self.videoRecorder.spool:
+            self.videoRecorder.finish(timeout=10.0)
+            self.videoRecorder.join(timeout=5.0)  # finish() returns before the thread exits
+            if self.videoRecorder.is_alive():
+                # Still writing the spool: encoding it now would read a half-written file
+                self.log("encodeSpool,skipped,recorderAlive")
+                return
+            self.encoding = self.videoRecorder.encodeSpool()
+            self.log("encodeSpool,start")
+            self.finish_button.setDisabled(True)
+            self.encode_timer.start(500)
+
+    def updateEncodeProgress(self):
+        process, progress = self.encoding
+        if process.is_alive():
+            self.finish_label.setText(self.finish_text + 'Saving recording... %d%%' % int(progress.value * 100))
+            return
+        self.encode_timer.stop()
+        self.log("encodeSpool,end,%s" % process.exitcode)
+        self.finish_label.setText(self.finish_text)
+        self.finish_button.setEnabled(True)
+
 
 if __name__ == '__main__':
+    # Pyinstaller fix. Must come first: a frozen multiprocessing child (VideoRecorder.encodeSpool) re-runs this
+    # block up to here, and must not touch ./output before it is diverted to its target
+    freeze_support()
+
+    # Move the logs of an interrupted previous session aside before this session overwrites them. Never in a
+    # multiprocessing child: the parent's session is running there, with its logs still open
+    interrupted_dir = None
+    if parent_process() is None:
+        try:
+            interrupted_dir = recovery.archive_interrupted("./output")
+        except Exception as e:
+            print(e)
+
     if not os.path.exists('output'):
         os.mkdir('output')
 
@@ -1281,8 +1301,13 @@ if __name__ == '__main__':
         with open('./output/stderr.txt', 'w', buffering=1, encoding='UTF-8') as stderr:
             sys.stderr = stderr
 
-            # Pyinstaller fix
-            freeze_support()
+            if interrupted_dir is not None:
+                print("sessionArchived,%s" % interrupted_dir, flush=True)
+                try:
+                    for path in recovery.recover(interrupted_dir):
+                        print("logRecovered,%s" % path, flush=True)
+                except Exception:
+                    traceback.print_exc()
 
             # PyQT
             app = QApplication(sys.argv)
@@ -1,4 +1,5 @@
 # -*- mode: python ; coding: utf-8 -*-
+from PyInstaller.utils.hooks import collect_dynamic_libs
 
 block_cipher = None
 
@@ -15,9 +16,10 @@ app_icon_path = "./resources/nmsl_logo_yellow.ico"
 
 a = Analysis(['main.py'],
              pathex=[python_path, python_package_path, python_cv2_path, vlc_path],
-             binaries=[(vlc_plugins_path, "plugins")],
+             # PortAudio DLL of sounddevice (utils/audio.py), loaded from _sounddevice_data/portaudio-binaries
+             binaries=[(vlc_plugins_path, "plugins")] + collect_dynamic_libs("_sounddevice_data"),
              datas=[('./resources/libvlc.dll', '.'), ('./resources/axvlc.dll', '.'), ('./resources/libvlccore.dll', '.'), ('./resources/npvlc.dll', '.')],
-             hiddenimports=["pynput.keyboard._win32", "pynput.mouse._win32"],
+             hiddenimports=["pynput.keyboard._win32", "pynput.mouse._win32", "_sounddevice_data"],
              hookspath=[],
              runtime_hooks=[],
              excludes=[],
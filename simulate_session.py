@@ -0,0 +1,52 @@
+"""
+Headless session simulation on a virtual clock (no VLC, display or sound card needed).
+Runs ProbeRunner and the time label against a simulated player and participant, writes the usual probe files
+and prints a timing report.
+
+$ python simulate_session.py --video Main-video:60
+$ python simulate_session.py --policy exponential --user-id 12 --output ./sim
+"""
+import argparse
+import tempfile
+import time
+import os
+
+from utils import probe_schedule, simulation
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", action="append", default=None, metavar="NAME:MINUTES",
+                        help="video to play, repeatable; the first one is the demo (default: Pre-video:3 "
+                             "Main-video:60)")
+    parser.add_argument("--policy", default=probe_schedule.FIXED, choices=probe_schedule.POLICIES)
+    parser.add_argument("--interval", type=int, default=40000, help="mean probe interval (ms)")
+    parser.add_argument("--user-id", default="0", help="seeds the probe schedules like a real session")
+    parser.add_argument("--seed", type=int, default=0, help="seeds the simulated participant")
+    parser.add_argument("--audio-latency", type=float, default=20., help="simulated ding onset delay (ms)")
+    parser.add_argument("--output", default=None, help="keep output files in this directory")
+    args = parser.parse_args()
+
+    videos = []
+    for spec in args.video or ["Pre-video:3", "Main-video:60"]:
+        name, _, minutes = spec.rpartition(":")
+        videos.append((name, int(float(minutes) * 60000)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = args.output or tmp
+        start = time.perf_counter()
+        reports = simulation.simulate_session(videos, output_dir, args.user_id, args.policy, args.interval,
+                                              args.seed, audio_latency=args.audio_latency)
+        elapsed = time.perf_counter() - start
+
+        lines = [simulation.REPORT_HEADER] + [simulation.format_report(r) for r in reports]
+        with open(os.path.join(output_dir, "simulation_report.txt"), 'w', encoding='UTF-8') as output:
+            output.write("\n".join(lines) + "\n")
+
+        simulated = sum(length for _, length in videos) / 1000
+        print("\n".join(lines))
+        print("simulated %.0f s in %.2f s (%.0fx)" % (simulated, elapsed, simulated / elapsed if elapsed else 0.))
+
+
+if __name__ == '__main__':
+    main()
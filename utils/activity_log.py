@@ -0,0 +1,237 @@
+from collections import deque
+from threading import Thread, Event
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Raw input events as queued by the listener callbacks: (time.time(), kind, *args)
+MOVE = "move"  # x, y
+CLICK = "click"  # x, y, button, pressed
+SCROLL = "scroll"  # x, y, dx, dy
+PRESS = "press"  # key
+RELEASE = "release"  # key
+
+# Callback durations are tiny: histogram in microseconds
+CALLBACK_EDGES_US = (1, 2, 5, 10, 20, 50, 100, 1000, 10000)
+
+# Event type codes of the binary log
+CODE_MOVE = 1
+CODE_BUTTON_DOWN = 2
+CODE_BUTTON_UP = 3
+CODE_SCROLL = 4
+CODE_KEY_DOWN = 5
+CODE_KEY_UP = 6
+MOUSE_CODES = (CODE_MOVE, CODE_BUTTON_DOWN, CODE_BUTTON_UP, CODE_SCROLL)
+KEY_CODES = (CODE_KEY_DOWN, CODE_KEY_UP)
+
+# One packed record per input event (23 bytes). Fields an event does not have are 0, and id is -1.
+# id: index of the button / key name in the log's key-name dictionary (<log>.keys, one JSON string per line).
+ACTIVITY_DTYPE = np.dtype([('time', '<f8'), ('code', 'u1'), ('x', '<i4'), ('y', '<i4'),
+                           ('dx', '<i2'), ('dy', '<i2'), ('id', '<i2')])
+NO_ID = -1
+
+
+def format_mouse(record) -> str:
+    t, kind = record[0], record[1]
+    if kind == MOVE:
+        return "%f,mouse,move,%d,%d\n" % (t, record[2], record[3])
+    if kind == CLICK:
+        return "%f,mouse,click,%s,%d,%d,%d\n" % (t, record[4], record[5], record[2], record[3])
+    return "%f,mouse,scroll,%d,%d,%d,%d\n" % (t, record[2], record[3], record[4], record[5])
+
+
+def format_key(record) -> str:
+    return "%f,key,%s,%s\n" % (record[0], record[1], record[2])
+
+
+def names_path(path: str) -> str:
+    return path + ".keys"
+
+
+class BatchWriter(Thread):
+    """
+    Binary activity log written by a background thread in batches. Producers only `append()` a raw tuple to a
+    deque (atomic, no lock), and the writer packs everything queued every `interval` seconds into one block of
+    ACTIVITY_DTYPE records and writes it in one call. Button / key names get an id the first time they appear,
+    and are appended to the key-name dictionary before the block that uses them.
+
+    An event that cannot be packed (e.g. a value out of its field's range) is dropped and logged, and a failed
+    write is logged; either way the thread keeps draining.
+    """
+
+    max_logged_errors = 10
+
+    def __init__(self, path: str, interval=0.25, log=print):
+        super().__init__()
+        self.daemon = True
+        self.path = path
+        self.interval = interval
+        self.log = log
+        self.buffer = deque()
+        self.append = self.buffer.append
+        self.stop_event = Event()
+        self.output = open(path, 'wb')
+        self.names_output = open(names_path(path), 'w', encoding='UTF-8')
+        self.ids = {}
+
+        self.events = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.bytes = 0
+        self.errors = 0
+        self.started = None
+        self.stopped = None
+
+    def run(self) -> None:
+        self.started = time.monotonic()
+        while not self.stop_event.wait(self.interval):
+            self.try_drain()
+        self.try_drain()
+        self.stopped = time.monotonic()
+        self.names_output.close()
+        self.output.close()
+
+    def name_id(self, name) -> int:
+        name = str(name)
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.ids)
+            self.names_output.write(json.dumps(name, ensure_ascii=False) + "\n")
+        return i
+
+    def encode(self, record) -> tuple:
+        t, kind = record[0], record[1]
+        if kind == MOVE:
+            return t, CODE_MOVE, record[2], record[3], 0, 0, NO_ID
+        if kind == CLICK:
+            return (t, CODE_BUTTON_DOWN if record[5] else CODE_BUTTON_UP, record[2], record[3], 0, 0,
+                    self.name_id(record[4]))
+        if kind == SCROLL:
+            return t, CODE_SCROLL, record[2], record[3], record[4], record[5], NO_ID
+        return t, CODE_KEY_DOWN if kind == PRESS else CODE_KEY_UP, 0, 0, 0, 0, self.name_id(record[2])
+
+    def error(self, what: str, e: Exception):
+        self.errors += 1
+        if self.errors <= self.max_logged_errors:
+            self.log("activityLogError,%s,%s,%s" % (self.path, what, str(e).replace('\n', ' ')))
+
+    def pack(self, records: list) -> np.ndarray:
+        try:
+            return np.array([self.encode(r) for r in records], dtype=ACTIVITY_DTYPE)
+        except Exception:
+            pass
+        rows = []  # slow path: find the events that cannot be packed
+        for record in records:
+            try:
+                row = self.encode(record)
+                np.array([row], dtype=ACTIVITY_DTYPE)
+                rows.append(row)
+            except Exception as e:
+                self.error("pack %r" % (record,), e)
+        return np.array(rows, dtype=ACTIVITY_DTYPE)
+
+    def try_drain(self):
+        try:
+            self.drain()
+        except Exception as e:
+            self.error("write", e)
+
+    def drain(self):
+        n = len(self.buffer)
+        if n == 0:
+            return
+        popleft = self.buffer.popleft
+        block = self.pack([popleft() for _ in range(n)])
+        self.names_output.flush()
+        self.output.write(block.tobytes())
+        self.output.flush()
+        self.events += len(block)
+        self.batches += 1
+        self.max_batch = max(self.max_batch, len(block))
+        self.bytes += block.nbytes
+
+    def close(self, timeout=None):
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        elif not self.output.closed:  # never started
+            self.try_drain()
+            self.names_output.close()
+            self.output.close()
+
+    def format_stats(self) -> str:
+        """
+        :return: events, batches, largest batch, bytes, events per second, errors
+        """
+        elapsed = (self.stopped or time.monotonic()) - self.started if self.started is not None else 0.
+        return "%d,%d,%d,%d,%.1f,%d" % (self.events, self.batches, self.max_batch, self.bytes,
+                                        self.events / elapsed if elapsed > 0 else 0., self.errors)
+
+
+def load_activity(path: str):
+    """
+    Memory-map a binary activity log. A record cut short by an abnormal exit is ignored.
+
+    :param path: log written by BatchWriter
+    :return: (records, names) where records is a read-only memmap of ACTIVITY_DTYPE and names[id] is the
+             button / key name of a record's id
+    """
+    names = []
+    if os.path.exists(names_path(path)):
+        with open(names_path(path), encoding='UTF-8') as f:
+            names = [json.loads(line) for line in f if line.endswith("\n")]
+    count = os.path.getsize(path) // ACTIVITY_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=ACTIVITY_DTYPE), names
+    return np.memmap(path, dtype=ACTIVITY_DTYPE, mode='r', shape=(count,)), names
+
+
+def decode(row: tuple, names: list) -> tuple:
+    """
+    :param row: one record as a tuple, e.g. from records.tolist()
+    :return: the raw event tuple it was packed from, with names instead of the pynput objects
+    """
+    t, code, x, y, dx, dy, i = row
+    if code == CODE_MOVE:
+        return t, MOVE, x, y
+    if code in (CODE_BUTTON_DOWN, CODE_BUTTON_UP):
+        return t, CLICK, x, y, names[i], code == CODE_BUTTON_DOWN
+    if code == CODE_SCROLL:
+        return t, SCROLL, x, y, dx, dy
+    return t, PRESS if code == CODE_KEY_DOWN else RELEASE, names[i]
+
+
+def to_text(path: str, text_path: str):
+    """
+    Convert a binary activity log to the legacy `mouse_log_<video>.txt` / `keyboard_log_<video>.txt` format.
+    """
+    records, names = load_activity(path)
+    with open(text_path, 'w', encoding='UTF-8') as output:
+        for start in range(0, len(records), 4096):
+            output.write(''.join((format_mouse if row[1] in MOUSE_CODES else format_key)(decode(row, names))
+                                 for row in records[start:start + 4096].tolist()))
+
+
+def convert_all(output_dir="./output"):
+    """
+    Write the legacy text of every binary activity log that has none, e.g. after an abnormal exit.
+
+    :return: paths of the text logs written
+    """
+    converted = []
+    for path in sorted(glob.glob(os.path.join(output_dir, "mouse_log_*.bin")) +
+                       glob.glob(os.path.join(output_dir, "keyboard_log_*.bin"))):
+        text_path = os.path.splitext(path)[0] + ".txt"
+        if not os.path.exists(text_path):
+            to_text(path, text_path)
+            converted.append(text_path)
+    return converted
+
+
+if __name__ == '__main__':
+    for p in convert_all(sys.argv[1] if len(sys.argv) > 1 else "./output"):
+        print("converted,%s" % p)
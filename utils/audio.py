@@ -0,0 +1,138 @@
+from collections import deque
+from threading import Event
+import time
+import wave
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from utils.recorder_stats import LatencyStats
+
+try:
+    import sounddevice
+except (ImportError, OSError):  # optional: sound.play falls back to playsound (OSError: PortAudio missing)
+    sounddevice = None
+
+_SAMPLE_TYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def decode(path: str, rate=48000, channels=2) -> np.ndarray:
+    """
+    Read a PCM WAV file as float32, converted to `rate` and `channels` if it was saved differently.
+    The cues in resources/ are stored at the engine's rate, so normally nothing is converted.
+
+    :return: (samples, channels) array
+    """
+    with wave.open(path, 'rb') as f:
+        width = f.getsampwidth()
+        if width not in _SAMPLE_TYPES:
+            raise ValueError("%s: unsupported sample width %d" % (path, width))
+        source_rate = f.getframerate()
+        source_channels = f.getnchannels()
+        data = f.readframes(f.getnframes())
+    pcm = np.frombuffer(data, dtype=_SAMPLE_TYPES[width]).reshape(-1, source_channels).astype(np.float32)
+    if width == 1:
+        pcm = (pcm - 128.) / 128.
+    else:
+        pcm /= float(2 ** (8 * width - 1))
+    if source_rate != rate and len(pcm) > 0:
+        source = np.arange(len(pcm)) / source_rate
+        target = np.arange(int(len(pcm) * rate / source_rate)) / rate
+        pcm = np.stack([np.interp(target, source, pcm[:, c]) for c in range(source_channels)], axis=1)
+    if source_channels != channels:
+        pcm = np.repeat(pcm.mean(axis=1, keepdims=True), channels, axis=1)
+    return np.ascontiguousarray(pcm, dtype=np.float32)
+
+
+def trim_silence(pcm: np.ndarray, threshold=1e-3) -> np.ndarray:
+    """
+    Drop the leading samples below `threshold`, so a cue's first sample is its audible start (the bundled cues
+    begin with 45-110 ms of near-silence) and the onset stamped on it is when it can be heard.
+    """
+    audible = np.flatnonzero(np.abs(pcm).max(axis=1) > threshold)
+    return pcm[audible[0]:] if len(audible) else pcm
+
+
+class Playback:
+    """
+    One play() request. `onset` is the estimated time.time() at which its first (audible) sample reaches the DAC,
+    filled in by the audio callback; `started` is set at the same moment.
+    """
+
+    def __init__(self, name: str, pcm: np.ndarray):
+        self.name = name
+        self.pcm = pcm
+        self.pos = 0
+        self.requested = time.time()
+        self.onset: Optional[float] = None
+        self.started = Event()
+
+    def latency(self) -> Optional[float]:
+        """
+        :return: ms from the request to the onset, None before the onset
+        """
+        return None if self.onset is None else (self.onset - self.requested) * 1000
+
+
+class AudioEngine:
+    """
+    Cues decoded once into PCM and mixed into one persistent low-latency output stream, so playing a cue is a
+    list append instead of opening and decoding a file.
+
+    The audio callback stamps each cue with the DAC time of the block it starts in, converted to time.time(),
+    which gives the onset latency of every play.
+    """
+
+    def __init__(self, rate=48000, channels=2, blocksize=128, latency='low'):
+        if sounddevice is None:
+            raise RuntimeError("sounddevice is not installed")
+        self.rate = rate
+        self.channels = channels
+        self.cues: Dict[str, np.ndarray] = {}
+        self.pending = deque()  # filled by play(), emptied by the callback
+        self.voices = []  # only touched by the callback
+        self.onset_latency = LatencyStats()
+        self.underruns = 0
+        self.stream = sounddevice.OutputStream(samplerate=rate, channels=channels, dtype='float32',
+                                               blocksize=blocksize, latency=latency, callback=self.callback)
+
+    def load(self, name: str, path: str):
+        self.cues[name] = trim_silence(decode(path, self.rate, self.channels))
+
+    def start(self):
+        self.stream.start()
+
+    def play(self, name: str) -> Playback:
+        playback = Playback(name, self.cues[name])
+        self.pending.append(playback)
+        return playback
+
+    def callback(self, outdata, frames, time_info, status):
+        now = time.time()
+        if status.output_underflow:
+            self.underruns += 1
+        # DAC time of this block on the wall clock; some host APIs report 0, then use the nominal latency
+        if time_info.outputBufferDacTime > 0:
+            dac = now + (time_info.outputBufferDacTime - time_info.currentTime)
+        else:
+            dac = now + self.stream.latency
+
+        while self.pending:
+            playback = self.pending.popleft()
+            playback.onset = dac
+            self.onset_latency.add(playback.latency())
+            playback.started.set()
+            self.voices.append(playback)
+
+        outdata.fill(0)
+        for playback in self.voices:
+            chunk = playback.pcm[playback.pos:playback.pos + frames]
+            outdata[:len(chunk)] += chunk
+            playback.pos += len(chunk)
+        self.voices = [p for p in self.voices if p.pos < len(p.pcm)]
+        np.clip(outdata, -1., 1., out=outdata)
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
@@ -1,14 +1,16 @@
 import cv2
-import os, sys
+import os
 
+from utils.frame_source import CameraSource
 
-def select_camera(path="test.png"):
+
+def select_cameras(path="test.png"):
+    """
+    :return: indices of every camera that delivers frames.
+    """
     port_list = []
     for i in range(10):
-        if sys.platform == "darwin":
-            cap = cv2.VideoCapture(i)
-        else:
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
+        cap = CameraSource(i)
         try:
             success = 0
             if cap.isOpened():
@@ -29,6 +31,11 @@ def select_camera(path="test.png"):
     except OSError:
         pass
 
+    return port_list
+
+
+def select_camera(path="test.png"):
+    port_list = select_cameras(path)
     if len(port_list) == 0:
         return None
     else:
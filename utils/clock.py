@@ -0,0 +1,38 @@
+import time
+
+
+class SystemClock:
+    """
+    Wall clock (time.time) and monotonic clock (time.monotonic) of this machine.
+    """
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+SYSTEM = SystemClock()
+
+
+class VirtualClock:
+    """
+    Simulated clock that only moves when `advance_to()` is called, for running sessions faster than real time.
+    """
+
+    def __init__(self, epoch=0.):
+        """
+        :param epoch: value of time() at monotonic() == 0
+        """
+        self.epoch = epoch
+        self.now = 0.
+
+    def time(self) -> float:
+        return self.epoch + self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance_to(self, now: float):
+        self.now = max(self.now, now)
@@ -0,0 +1,117 @@
+import subprocess
+import tempfile
+import shutil
+import time
+import os
+
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import cv2
+
+from utils.frame_source import synthetic_frames
+
+# (name, fourcc, file extension). "pipe" streams raw BGR frames into an external ffmpeg process.
+CANDIDATES = [
+    ("mpeg", "mpeg", ".mp4"),
+    ("MJPG", "MJPG", ".avi"),
+    ("XVID", "XVID", ".avi"),
+    ("pipe", None, ".mp4"),
+]
+DEFAULT = CANDIDATES[0]
+
+
+class PipeWriter:
+    """
+    cv2.VideoWriter look-alike that pipes raw frames to ffmpeg (ultrafast x264).
+    """
+
+    def __init__(self, path: str, fps: float, size):
+        self.process = subprocess.Popen(
+            [shutil.which("ffmpeg"), "-loglevel", "error", "-y",
+             "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", "%dx%d" % tuple(size), "-r", str(fps), "-i", "-",
+             "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def isOpened(self):
+        return self.process.poll() is None
+
+    def write(self, frame):
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, OSError):
+            pass
+
+    def release(self):
+        if self.process.stdin.closed:
+            return
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class CodecResult(NamedTuple):
+    name: str
+    fourcc: Optional[str]
+    ext: str
+    fps: float  # encoded frames per second
+    bitrate: float  # bits per second of video
+
+
+def open_writer(codec, path: str, fps: float, size):
+    """
+    :param codec: entry of CANDIDATES (or CodecResult)
+    :param path: output path without extension
+    :return: (writer, path with extension)
+    """
+    name, fourcc, ext = codec[:3]
+    path = path + ext
+    if fourcc is None:
+        return PipeWriter(path, fps, size), path
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size), path
+
+
+def benchmark(codec, size, fps=30.0, seconds=2.0) -> Optional[CodecResult]:
+    """
+    Encode `seconds` worth of synthetic frames as fast as possible.
+
+    :return: CodecResult, or None if the codec is unavailable on this machine.
+    """
+    name, fourcc, ext = codec
+    if fourcc is None and shutil.which("ffmpeg") is None:
+        return None
+    frames = synthetic_frames(size)
+    n_frames = int(fps * seconds)
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            writer, path = open_writer(codec, os.path.join(tmp, "probe"), fps, size)
+            if not writer.isOpened():
+                return None
+            start = time.perf_counter()
+            for i in range(n_frames):
+                writer.write(frames[i % len(frames)])
+            writer.release()
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            print(e)
+            return None
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            return None
+        return CodecResult(name, fourcc, ext, n_frames / max(elapsed, 1e-6), os.path.getsize(path) * 8 / seconds)
+
+
+def select_codec(size, fps=30.0, seconds=2.0, candidates=CANDIDATES):
+    """
+    Benchmark every candidate and pick the fastest one that keeps up with `fps`
+    (or simply the fastest if none does).
+
+    :return: (selected CodecResult or None if nothing works, list of all results)
+    """
+    results: List[CodecResult] = []
+    for codec in candidates:
+        result = benchmark(codec, size, fps, seconds)
+        if result is not None:
+            results.append(result)
+    if len(results) == 0:
+        return None, results
+    keeps_up = [r for r in results if r.fps >= fps]
+    return max(keeps_up or results, key=lambda r: r.fps), results
@@ -0,0 +1,89 @@
+from threading import Thread, Event
+import time
+
+import dlib
+import cv2
+
+from utils.frame_bus import FrameBus
+
+
+class FaceTracker(Thread):
+    """
+    Runs the dlib frontal face detector on the latest published frame a few times per second and keeps
+    a smoothed square crop box around the face, so the encoder can crop every frame without detecting.
+
+    The box only follows the face when it moves by more than `deadzone` (fraction of the box side),
+    which keeps the cropped stream steady.
+    """
+
+    def __init__(self, bus: FrameBus, frame_size, detect_width=320, margin=1.8, smoothing=0.3, deadzone=0.05,
+                 interval=0.2):
+        super().__init__()
+        self.daemon = True
+        self.subscriber = bus.subscribe()
+        self.bus = bus
+        self.frame_w, self.frame_h = frame_size
+        self.detect_width = detect_width
+        self.margin = margin
+        self.smoothing = smoothing
+        self.deadzone = deadzone
+        self.interval = interval
+        self.stop_event = Event()
+        self.detections = 0
+        self.misses = 0
+
+        # Until a face is found: the largest centered square
+        side = min(self.frame_w, self.frame_h)
+        self.center = (self.frame_w / 2, self.frame_h / 2)
+        self.side = float(side)
+        self.box = self._box()
+
+    def _box(self):
+        side = int(min(self.side, self.frame_w, self.frame_h))
+        x = int(min(max(self.center[0] - side / 2, 0), self.frame_w - side))
+        y = int(min(max(self.center[1] - side / 2, 0), self.frame_h - side))
+        return x, y, side, side
+
+    def crop_box(self):
+        """
+        :return: (x, y, w, h) of the current crop, always inside the frame.
+        """
+        return self.box
+
+    def update(self, rect, scale: float):
+        (left, top, right, bottom) = (rect.left() * scale, rect.top() * scale, rect.right() * scale, rect.bottom() * scale)
+        center = ((left + right) / 2, (top + bottom) / 2)
+        side = max(right - left, bottom - top) * self.margin
+
+        moved = max(abs(center[0] - self.center[0]), abs(center[1] - self.center[1]), abs(side - self.side))
+        if moved < self.deadzone * self.side:
+            return
+        a = self.smoothing
+        self.center = (self.center[0] + a * (center[0] - self.center[0]), self.center[1] + a * (center[1] - self.center[1]))
+        self.side += a * (side - self.side)
+        self.box = self._box()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self) -> None:
+        detector = dlib.get_frontal_face_detector()
+        scale = self.frame_w / self.detect_width
+        size = (self.detect_width, int(self.frame_h / scale))
+        while not self.stop_event.is_set():
+            start = time.monotonic()
+            ref = self.subscriber.next(timeout=0.5)
+            if ref is None:
+                continue
+            small = cv2.resize(ref.frame, size)
+            if not self.bus.is_valid(ref.seq):  # overwritten while resizing
+                continue
+            rects = detector(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), 0)
+            if len(rects) > 0:
+                self.update(max(rects, key=lambda r: r.area()), scale)
+                self.detections += 1
+            else:
+                self.misses += 1
+            delay = self.interval - (time.monotonic() - start)
+            if delay > 0:
+                self.stop_event.wait(delay)
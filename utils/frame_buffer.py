@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+
+
+class FrameRingBuffer:
+    """
+    Bounded single-producer / single-consumer ring of preallocated frame slots.
+
+    The capture thread reads straight into `acquire()`'d slots and `commit()`s them,
+    the encoder thread `get()`s the oldest frame and `release()`s it once written.
+    When the encoder falls behind, new frames are discarded (never the ones being encoded)
+    and counted in `dropped`. Every committed frame keeps its capture index, which counts dropped frames too.
+    """
+
+    def __init__(self, shape, capacity=64, dtype=np.uint8):
+        self.capacity = capacity
+        self.frames = np.empty((capacity,) + tuple(shape), dtype=dtype)
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.monotonic = np.zeros(capacity, dtype=np.float64)
+        self.pos_msec = np.zeros(capacity, dtype=np.float64)
+        self.capture = np.zeros(capacity, dtype=np.int64)
+        self.scratch = np.empty(tuple(shape), dtype=dtype)
+
+        self.written = 0
+        self.read = 0
+        self.high_water = 0
+        self.dropped = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return self.written - self.read
+
+    @property
+    def captured(self) -> int:
+        """
+        Frames captured so far, committed or dropped: the capture index of the next frame.
+        """
+        return self.written + self.dropped
+
+    def acquire(self):
+        """
+        :return: the slot the next frame should be captured into, or None if the buffer is full.
+        """
+        with self._cond:
+            if self.written - self.read >= self.capacity:
+                return None
+            return self.frames[self.written % self.capacity]
+
+    def commit(self, timestamp: float, monotonic: float = 0., pos_msec: float = 0.):
+        with self._cond:
+            idx = self.written % self.capacity
+            self.times[idx] = timestamp
+            self.monotonic[idx] = monotonic
+            self.pos_msec[idx] = pos_msec
+            self.capture[idx] = self.written + self.dropped
+            self.written += 1
+            self.high_water = max(self.high_water, self.written - self.read)
+            self._cond.notify()
+
+    def drop(self):
+        with self._cond:
+            self.dropped += 1
+
+    def get(self, timeout=None):
+        """
+        Wait for the oldest committed frame. The slot stays valid until `release()`.
+
+        :param timeout: seconds to wait
+        :return: (frame, timestamp, monotonic, pos_msec, capture index), or None on timeout / when closed and
+                 drained.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.written > self.read or self.closed, timeout):
+                return None
+            if self.written == self.read:
+                return None
+            idx = self.read % self.capacity
+            return self.frames[idx], self.times[idx], self.monotonic[idx], self.pos_msec[idx], int(self.capture[idx])
+
+    def release(self):
+        with self._cond:
+            self.read += 1
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def is_drained(self):
+        with self._cond:
+            return self.closed and self.written == self.read
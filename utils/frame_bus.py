@@ -0,0 +1,141 @@
+from multiprocessing import shared_memory
+from typing import NamedTuple, Optional
+import threading
+import time
+
+import numpy as np
+
+_HEADER = 8  # int64: published count, slots, frame shape (up to 3 dims)
+
+
+class FrameRef(NamedTuple):
+    seq: int
+    frame: np.ndarray  # view into the bus, valid while bus.is_valid(seq)
+    timestamp: float
+
+
+class FrameBus:
+    """
+    Single-publisher, many-subscriber frame bus over a fixed ring of preallocated slots.
+
+    Subscribers get views into the slots instead of copies. A slot's sequence number is cleared while it is
+    being overwritten, so a reader can check `is_valid(seq)` after using a frame to detect that it was too slow.
+    With `shared=True` the ring lives in `multiprocessing.shared_memory` and other processes can `attach()` by name.
+    """
+
+    def __init__(self, shape, slots=8, shared=False, name=None, create=True):
+        self.shape = tuple(int(x) for x in shape)
+        self.slots = slots
+        self.owner = create
+        frame_bytes = int(np.prod(self.shape))
+        size = 8 * _HEADER + 16 * slots + slots * frame_bytes
+
+        if shared:
+            self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+            buf = self.shm.buf
+        else:
+            self.shm = None
+            buf = bytearray(size)
+        self.header = np.ndarray((_HEADER,), np.int64, buf, 0)
+        self.seqs = np.ndarray((slots,), np.int64, buf, 8 * _HEADER)
+        self.times = np.ndarray((slots,), np.float64, buf, 8 * _HEADER + 8 * slots)
+        self.frames = np.ndarray((slots,) + self.shape, np.uint8, buf, 8 * _HEADER + 16 * slots)
+
+        if create:
+            self.header[:] = 0
+            self.header[1] = slots
+            self.header[2:2 + len(self.shape)] = self.shape
+            self.seqs[:] = -1
+        self._cond = threading.Condition()
+
+    @property
+    def name(self):
+        return self.shm.name if self.shm is not None else None
+
+    @classmethod
+    def attach(cls, name: str):
+        """
+        Open a bus created with `shared=True` in another process.
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray((_HEADER,), np.int64, shm.buf, 0).copy()
+        shm.close()
+        shape = tuple(int(x) for x in header[2:5] if x > 0)
+        return cls(shape, int(header[1]), shared=True, name=name, create=False)
+
+    def published(self) -> int:
+        return int(self.header[0])
+
+    def publish(self, frame, timestamp: float):
+        seq = int(self.header[0])
+        i = seq % self.slots
+        self.seqs[i] = -1
+        np.copyto(self.frames[i], frame)
+        self.times[i] = timestamp
+        self.seqs[i] = seq
+        self.header[0] = seq + 1
+        with self._cond:
+            self._cond.notify_all()
+
+    def is_valid(self, seq: int) -> bool:
+        return self.seqs[seq % self.slots] == seq
+
+    def latest(self) -> Optional[FrameRef]:
+        n = int(self.header[0])
+        if n == 0:
+            return None
+        seq = n - 1
+        i = seq % self.slots
+        if self.seqs[i] != seq:
+            return None
+        return FrameRef(seq, self.frames[i], float(self.times[i]))
+
+    def wait(self, after: int, timeout=None) -> bool:
+        """
+        Wait until a frame newer than sequence number `after` is published.
+        Condition-based in the publishing process, polling in attached processes.
+        """
+        if self.owner:
+            with self._cond:
+                return self._cond.wait_for(lambda: self.header[0] > after + 1, timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.header[0] <= after + 1:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.002)
+        return True
+
+    def subscribe(self) -> "FrameSubscriber":
+        return FrameSubscriber(self)
+
+    def close(self):
+        if self.shm is None:
+            return
+        del self.header, self.seqs, self.times, self.frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+
+class FrameSubscriber:
+    """
+    Latest-frame consumer: `next()` returns the newest unseen frame and counts the ones it skipped.
+    """
+
+    def __init__(self, bus: FrameBus):
+        self.bus = bus
+        self.last = bus.published() - 1
+        self.received = 0
+        self.skipped = 0
+
+    def next(self, timeout=None) -> Optional[FrameRef]:
+        if not self.bus.wait(self.last, timeout):
+            return None
+        ref = self.bus.latest()
+        if ref is None:
+            return None
+        self.skipped += max(ref.seq - self.last - 1, 0)
+        self.received += 1
+        self.last = ref.seq
+        return ref
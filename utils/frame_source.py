@@ -0,0 +1,197 @@
+from abc import ABC, abstractmethod
+import sys
+import time
+
+import numpy as np
+import cv2
+
+
+def synthetic_frames(size, count=30, seed=0):
+    """
+    Moving gradient with sensor-like noise, so encoders cannot cheat on a static image.
+    """
+    w, h = size
+    rng = np.random.default_rng(seed)
+    base = np.add.outer(np.arange(h), np.arange(w)).astype(np.uint8)
+    frames = []
+    for i in range(count):
+        frame = np.dstack([np.roll(base, 8 * i, axis=1), np.roll(base, 4 * i, axis=0), base])
+        frame = frame + rng.integers(0, 16, frame.shape, dtype=np.uint8)
+        frames.append(np.ascontiguousarray(frame))
+    return frames
+
+
+class FrameSource(ABC):
+    """
+    Minimal cv2.VideoCapture interface (isOpened/read/grab/retrieve/get/set/release) shared by every source,
+    so the recorder and the camera preview never care where frames come from.
+    """
+
+    @abstractmethod
+    def isOpened(self) -> bool:
+        pass
+
+    @abstractmethod
+    def grab(self) -> bool:
+        pass
+
+    @abstractmethod
+    def retrieve(self, image=None):
+        pass
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop) -> float:
+        return 0.
+
+    def set(self, prop, value) -> bool:
+        return False
+
+    def release(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    def __init__(self, index: int):
+        if sys.platform == "darwin":
+            self.cap = cv2.VideoCapture(index)
+        else:
+            self.cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def grab(self):
+        return self.cap.grab()
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image)
+
+    def read(self, image=None):
+        return self.cap.read(image)
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+
+
+class _PacedSource(FrameSource):
+    """
+    Delivers frames no faster than `fps`, like a real camera does.
+    """
+
+    def __init__(self, fps: float):
+        self.fps = fps
+        self.start = None
+        self.count = 0
+
+    def wait(self):
+        if self.start is None:
+            self.start = time.perf_counter()
+        delay = self.start + self.count / self.fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.count += 1
+
+
+class FileSource(_PacedSource):
+    """
+    Replays a video file at its native frame rate, looping at the end if `loop`.
+    """
+
+    def __init__(self, path: str, loop=True):
+        self.cap = cv2.VideoCapture(path)
+        super().__init__(self.cap.get(cv2.CAP_PROP_FPS) or 30.)
+        self.loop = loop
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def grab(self):
+        self.wait()
+        if self.cap.grab():
+            return True
+        if not self.loop:
+            return False
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self.cap.grab()
+
+    def retrieve(self, image=None):
+        return self.cap.retrieve(image)
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticSource(_PacedSource):
+    """
+    Generated frames at a configurable resolution and frame rate; no hardware needed.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.):
+        super().__init__(fps)
+        self.size = (width, height)
+        self.frames = synthetic_frames(self.size)
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def grab(self):
+        if not self.opened:
+            return False
+        self.wait()
+        return True
+
+    def retrieve(self, image=None):
+        frame = self.frames[(self.count - 1) % len(self.frames)]
+        if image is None or image.shape != frame.shape:
+            return True, frame.copy()
+        np.copyto(image, frame)
+        return True, image
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.size[0])
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.size[1])
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return max(self.count - 1, 0) * 1000. / self.fps
+        return 0.
+
+    def release(self):
+        self.opened = False
+
+
+def open_source(spec) -> FrameSource:
+    """
+    :param spec: camera index, an existing FrameSource, or a string
+                 "camera:<index>", "file:<path>", "synthetic[:<width>x<height>[@<fps>]]"
+    """
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int):
+        return CameraSource(spec)
+    kind, _, arg = str(spec).partition(":")
+    if kind == "camera":
+        return CameraSource(int(arg or 0))
+    if kind == "file":
+        return FileSource(arg)
+    if kind == "synthetic":
+        resolution, _, fps = arg.partition("@")
+        width, _, height = (resolution or "640x480").partition("x")
+        return SyntheticSource(int(width), int(height), float(fps or 30))
+    raise ValueError("Unknown frame source: %r" % spec)
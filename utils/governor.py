@@ -0,0 +1,73 @@
+from typing import NamedTuple, Sequence
+
+
+class Level(NamedTuple):
+    scale: float  # encoded size relative to the camera frame
+    divisor: int  # encode every `divisor`-th captured frame
+
+
+# Ordered from best quality to cheapest. Bounds are configured by trimming this list.
+DEFAULT_LEVELS = (
+    Level(1.0, 1),
+    Level(0.75, 1),
+    Level(0.5, 1),
+    Level(0.5, 2),
+)
+
+
+class Governor:
+    """
+    Steps recording quality down when the encoder falls behind and back up once it has been idle for a while.
+
+    Call `update()` about once per second from the encoder with the ring buffer fill (0..1) and the number of
+    frames captured / encoded since the previous call. Pressure means the buffer is filling up or the encoder
+    did not keep up with the frames it was supposed to encode at the current level.
+    """
+
+    def __init__(self, levels: Sequence[Level] = DEFAULT_LEVELS, high=0.5, low=0.1, down_cooldown=2.0,
+                 up_after=15.0):
+        self.levels = tuple(levels)
+        self.high = high
+        self.low = low
+        self.down_cooldown = down_cooldown
+        self.up_after = up_after
+
+        self.index = 0
+        self.last_change = None
+        self.calm_since = None
+        self.changes = 0
+
+    @property
+    def level(self) -> Level:
+        return self.levels[self.index]
+
+    def update(self, now: float, fill: float, captured: int, encoded: int):
+        """
+        :return: reason string if the level changed, else None
+        """
+        if self.last_change is None:
+            self.last_change = now
+        expected = captured / self.level.divisor
+        pressure = fill >= self.high or encoded < 0.9 * expected - 1
+
+        if pressure:
+            self.calm_since = None
+            if self.index < len(self.levels) - 1 and now - self.last_change >= self.down_cooldown:
+                return self._step(now, +1, "down,%.2f,%d,%d" % (fill, captured, encoded))
+            return None
+
+        if fill <= self.low:
+            if self.calm_since is None:
+                self.calm_since = now
+            if self.index > 0 and now - self.calm_since >= self.up_after:
+                self.calm_since = now
+                return self._step(now, -1, "up,%.2f,%d,%d" % (fill, captured, encoded))
+        else:
+            self.calm_since = None
+        return None
+
+    def _step(self, now: float, delta: int, reason: str):
+        self.index += delta
+        self.last_change = now
+        self.changes += 1
+        return reason
@@ -0,0 +1,147 @@
+import os
+
+from typing import List
+
+import numpy as np
+
+from utils import codec, timeline
+from utils.recorder import VideoRecorder
+
+SYNC_HEADER = "camera,frames,fps,matched,mean_ms,median_ms,p95_abs_ms,max_abs_ms"
+
+
+def skew_stats(reference, other):
+    """
+    Offset (ms) from every reference frame to the nearest `other` frame, on the shared monotonic clock.
+    Only reference frames within the time span of `other` are matched.
+
+    :param reference: sorted monotonic timestamps (s) of the reference camera
+    :param other: sorted monotonic timestamps (s) of another camera
+    :return: (matched, mean, median, p95 of |offset|, max |offset|)
+    """
+    reference = np.asarray(reference)
+    other = np.asarray(other)
+    if len(reference) == 0 or len(other) == 0:
+        return 0, 0., 0., 0., 0.
+    reference = reference[(reference >= other[0]) & (reference <= other[-1])]
+    if len(reference) == 0:
+        return 0, 0., 0., 0., 0.
+    right = np.clip(np.searchsorted(other, reference), 1, len(other) - 1)
+    left = right - 1
+    nearest = np.where(reference - other[left] <= other[right] - reference, other[left], other[right])
+    offset = (nearest - reference) * 1000
+    return (len(offset), float(offset.mean()), float(np.median(offset)),
+            float(np.percentile(np.abs(offset), 95)), float(np.abs(offset).max()))
+
+
+class MultiVideoRecorder:
+    """
+    Records several cameras at once with one VideoRecorder (capture + encoder thread pair) per device.
+    All recorders stamp frames with time.monotonic(), so their timelines share one clock.
+
+    The first camera is the primary one: it writes to `output_dir` exactly like a single recorder and drives
+    the frame-count API used by calibration. Camera i > 0 writes to `output_dir`/camera_<i>.
+    When every recorder has stopped, a skew report against the primary camera is written to camera_sync.txt.
+    """
+
+    def __init__(self, cams: list, log=print, output_dir="./output", **kwargs):
+        """
+        :param cams: camera indices / frame source specs / opened FrameSources, primary first
+        :param kwargs: VideoRecorder options for the primary camera (others record plainly)
+        """
+        self.log = log
+        self.output_dir = output_dir
+        self.reported = False
+        self.recorders: List[VideoRecorder] = [VideoRecorder(cams[0], log, output_dir=output_dir, **kwargs)]
+        for i, cam in enumerate(cams[1:], start=1):
+            camera_dir = os.path.join(output_dir, "camera_%d" % i)
+            os.makedirs(camera_dir, exist_ok=True)
+            self.recorders.append(VideoRecorder(cam, lambda s, i=i: log("camera%d,%s" % (i, s)),
+                                                kwargs.get("video_codec", codec.DEFAULT),
+                                                output_dir=camera_dir))
+
+    @property
+    def primary(self) -> VideoRecorder:
+        return self.recorders[0]
+
+    @property
+    def spool(self):
+        return self.primary.spool
+
+    @property
+    def daemon(self):
+        return self.primary.daemon
+
+    @daemon.setter
+    def daemon(self, value: bool):
+        for recorder in self.recorders:
+            recorder.daemon = value
+
+    def start(self):
+        for recorder in self.recorders:
+            recorder.start()
+
+    def execute(self):
+        # Release every capture thread before waiting, so the cameras start together
+        for recorder in self.recorders:
+            recorder.event.set()
+        for recorder in self.recorders:
+            recorder.proceed_event.wait()
+
+    def finish(self, timeout=None):
+        for recorder in self.recorders:
+            if recorder.is_alive():
+                recorder.event.clear()
+        for recorder in self.recorders:
+            recorder.finish(timeout=timeout)
+        # finish() returns when run() signals its last step, the thread may not have exited yet
+        for recorder in self.recorders:
+            recorder.join(timeout)
+        if not any(recorder.is_alive() for recorder in self.recorders):
+            self.writeSyncReport()
+        else:
+            self.log("cameraSync,skipped,%d" % sum(r.is_alive() for r in self.recorders))
+
+    def join(self, timeout=None):
+        for recorder in self.recorders:
+            recorder.join(timeout)
+
+    def is_alive(self) -> bool:
+        return any(recorder.is_alive() for recorder in self.recorders)
+
+    def setFrameCount(self):
+        self.primary.setFrameCount()
+
+    def getFrameCount(self):
+        return self.primary.getFrameCount()
+
+    def beginFrameRange(self):
+        self.primary.beginFrameRange()
+
+    def endFrameRange(self, label: str):
+        return self.primary.endFrameRange(label)
+
+    def newSegment(self, reason: str):
+        for recorder in self.recorders:
+            recorder.newSegment(reason)
+
+    def encodeSpool(self):
+        return self.primary.encodeSpool()
+
+    def writeSyncReport(self):
+        if self.reported:
+            return
+        self.reported = True
+
+        stamps = []
+        for recorder in self.recorders:
+            records, _ = timeline.load_timeline(os.path.join(recorder.output_dir, "video_timeline.bin"))
+            stamps.append(np.array(records['monotonic']))
+
+        with open(os.path.join(self.output_dir, "camera_sync.txt"), 'w', encoding='UTF-8') as output:
+            output.write(SYNC_HEADER + "\n")
+            for i, mono in enumerate(stamps):
+                fps = (len(mono) - 1) / (mono[-1] - mono[0]) if len(mono) > 1 and mono[-1] > mono[0] else 0.
+                line = "%d,%d,%.2f,%d,%.3f,%.3f,%.3f,%.3f" % ((i, len(mono), fps) + skew_stats(stamps[0], mono))
+                output.write(line + "\n")
+                self.log("cameraSync,%s" % line)
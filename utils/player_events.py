@@ -0,0 +1,13 @@
+# Media player event kinds, independent of libvlc so player logic can also run against a simulated player.
+# Listeners are called as listener(kind, value); value is the media time / length (ms) for TIME_CHANGED /
+# LENGTH_CHANGED and 0 otherwise.
+PLAYING = "playing"
+PAUSED = "paused"
+STOPPED = "stopped"
+ENDED = "ended"
+ERROR = "error"
+TIME_CHANGED = "time"
+LENGTH_CHANGED = "length"
+
+# Kinds after which the media will not play any more
+FINAL = (STOPPED, ENDED, ERROR)
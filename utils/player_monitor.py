@@ -0,0 +1,81 @@
+from threading import Condition
+
+from utils import clock as clocks
+from utils import player_events
+
+
+class PlayerMonitor:
+    """
+    The one view of a media player's playback that every component shares. Player events are fed in through
+    `publish(kind, value)`; the monitor caches state, time and length and forwards each event to its
+    subscribers, so nobody has to poll the player.
+
+    `get_time()` extrapolates the last reported time with the clock while playing, so it is as fresh as a
+    get_time() call on the player without crossing into libvlc.
+    """
+
+    def __init__(self, clock=clocks.SYSTEM):
+        self.clock = clock
+        self.cond = Condition()
+        self.listeners = []
+        self.state = None  # last state kind (see utils/player_events.py), None before the media started
+        self.time = 0  # ms, last reported media time
+        self.time_clock = clock.monotonic()  # when `time` was reported, or playback (re)started
+        self.length = 0  # ms, 0 while unknown
+        self.events = 0
+
+    def subscribe(self, listener):
+        """
+        :param listener: called as listener(kind, value) on the thread that publishes, after the cache is updated
+        """
+        self.listeners = self.listeners + [listener]
+
+    def unsubscribe(self, listener):
+        self.listeners = [l for l in self.listeners if l != listener]
+
+    def publish(self, kind: str, value=0):
+        with self.cond:
+            now = self.clock.monotonic()
+            if kind == player_events.TIME_CHANGED:
+                self.time = value
+                self.time_clock = now
+            elif kind == player_events.LENGTH_CHANGED:
+                self.length = value
+            else:
+                if self.state == player_events.PLAYING:  # freeze the extrapolated time
+                    self.time = self._time(now)
+                self.time_clock = now
+                self.state = kind
+            self.events += 1
+            self.cond.notify_all()
+        for listener in self.listeners:
+            listener(kind, value)
+
+    def _time(self, now: float) -> int:
+        t = self.time
+        if self.state == player_events.PLAYING:
+            t += int((now - self.time_clock) * 1000)
+        return min(t, self.length) if self.length > 0 else t
+
+    def get_time(self) -> int:
+        with self.cond:
+            return self._time(self.clock.monotonic())
+
+    def get_length(self) -> int:
+        return self.length
+
+    def is_playing(self) -> bool:
+        return self.state == player_events.PLAYING
+
+    def is_over(self) -> bool:
+        return self.state in player_events.FINAL
+
+    def wait_started(self, timeout=None) -> bool:
+        """
+        Block until the media plays or fails.
+
+        :return: True if it is playing
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.state is not None, timeout)
+            return self.state == player_events.PLAYING
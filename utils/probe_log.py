@@ -0,0 +1,135 @@
+import glob
+import os
+import sys
+
+import numpy as np
+
+from utils import clock as clocks
+from utils.timeline import RecordWriter
+
+# Binary sidecar of probe_<video>.txt, one record per line plus an END record on a clean close.
+# SOUND: media_time, time (clock when the ding was requested), value = fire jitter (ms),
+#        scheduled = media time (ms) the probe was scheduled at, onset = clock when the ding reached the speaker
+#        (NaN when the audio engine could not tell)
+# PROBE: media_time, time (clock of the key press), answer = pressed key ('y', 'n', 'p')
+PROBE_LOG_DTYPE = np.dtype([('kind', 'u1'), ('answer', 'S1'), ('media_time', '<f8'), ('time', '<f8'),
+                            ('value', '<f8'), ('scheduled', '<f8'), ('onset', '<f8')])
+SOUND, PROBE, END = 0, 1, 2
+
+
+def sidecar_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".bin"
+
+
+def format_record(record) -> str:
+    if record['kind'] == SOUND:
+        return "%f,%f,sound,%f,%f,%f\n" % (record['media_time'], record['time'], record['value'],
+                                           record['scheduled'], record['onset'])
+    return "%f,%f,probe,%s\n" % (record['media_time'], record['time'], record['answer'].decode())
+
+
+class ProbeLogWriter:
+    """
+    Writes probe_<video>.txt as events happen, with a binary sidecar of the same events.
+    Both files are flushed at most `flush_interval` seconds after an event; callers that sleep longer than that
+    call `poll()` by `flush_deadline()`. The sidecar gets an END record on `close()`, so `recover()` can tell
+    an interrupted log apart from a finished one.
+    """
+
+    def __init__(self, path: str, flush_interval=1.0, clock=clocks.SYSTEM):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.output = open(path, 'w', encoding='UTF-8')
+        self.sidecar = RecordWriter(sidecar_path(path), PROBE_LOG_DTYPE, block_size=16)
+        self.dirty_since = None
+
+    def sound(self, media_time: float, timestamp: float, jitter: float, scheduled: float, onset=float('nan')):
+        self.output.write("%f,%f,sound,%f,%f,%f\n" % (media_time, timestamp, jitter, scheduled, onset))
+        self.sidecar.append(SOUND, b'', media_time, timestamp, jitter, scheduled, onset)
+        self._written()
+
+    def probe(self, media_time: float, timestamp: float, answer: str):
+        self.output.write("%f,%f,probe,%s\n" % (media_time, timestamp, answer))
+        self.sidecar.append(PROBE, answer.encode()[:1], media_time, timestamp, 0., 0., 0.)
+        self._written()
+
+    def error(self, string: str):
+        self.output.write(string + '\n')
+        self.flush()
+
+    def _written(self):
+        if self.dirty_since is None:
+            self.dirty_since = self.clock.monotonic()
+        self.poll()
+
+    def flush_deadline(self):
+        """
+        :return: clock.monotonic() by which `poll()` should be called, None if nothing is pending
+        """
+        if self.dirty_since is None:
+            return None
+        return self.dirty_since + self.flush_interval
+
+    def poll(self):
+        if self.dirty_since is not None and self.clock.monotonic() >= self.dirty_since + self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.output.flush()
+        self.sidecar.flush()
+        self.dirty_since = None
+
+    def close(self):
+        if self.output.closed:
+            return
+        self.sidecar.append(END, b'', 0., self.clock.time(), 0., 0., 0.)
+        self.sidecar.close()
+        self.output.close()
+
+
+def load_probe_log(path: str):
+    """
+    :param path: probe_<video>.txt or its sidecar
+    :return: (records without the END record and any torn trailing record, whether the log was closed)
+    """
+    data = np.fromfile(sidecar_path(path), dtype=np.uint8)
+    count = len(data) // PROBE_LOG_DTYPE.itemsize
+    records = data[:count * PROBE_LOG_DTYPE.itemsize].view(PROBE_LOG_DTYPE)
+    if count > 0 and records[-1]['kind'] == END:
+        return records[:-1], True
+    return records, False
+
+
+def recover(path: str) -> bool:
+    """
+    Rebuild probe_<video>.txt from its sidecar after an abnormal exit.
+    The previous text is kept as <name>.txt.partial.
+
+    :return: True if the log was interrupted and has been rebuilt
+    """
+    records, closed = load_probe_log(path)
+    if closed:
+        return False
+    if os.path.exists(path):
+        os.replace(path, path + ".partial")
+    with open(path, 'w', encoding='UTF-8') as output:
+        output.write(''.join(format_record(r) for r in records))
+    return True
+
+
+def recover_all(output_dir="./output"):
+    """
+    :return: paths of the probe logs that were rebuilt
+    """
+    recovered = []
+    for sidecar in sorted(glob.glob(os.path.join(output_dir, "probe_*.bin"))):
+        path = os.path.splitext(sidecar)[0] + ".txt"
+        if recover(path):
+            recovered.append(path)
+    return recovered
+
+
+if __name__ == '__main__':
+    for p in recover_all(sys.argv[1] if len(sys.argv) > 1 else "./output"):
+        print("recovered,%s" % p)
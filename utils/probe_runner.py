@@ -0,0 +1,273 @@
+from threading import Thread, Event, Condition
+import math
+import os
+
+from utils import clock as clocks
+from utils import player_events, probe_log, probe_schedule
+from utils.recorder_stats import LatencyStats
+from utils.response_channel import ResponseChannel
+
+
+class ProbeRunner(Thread):
+    """
+    Plays the probe sound at the media times of a precomputed ProbeSchedule and matches the participant's
+    answers to it.
+
+    Driven by player events instead of polling: the thread sleeps until the next probe is due, extrapolating the
+    media time from the last TIME_CHANGED event, and wakes early on play/pause/end events and on every answer
+    put into the ResponseChannel. The media time is confirmed with get_time() right before a probe fires.
+
+    Once the media reports its length, the schedule is cut off there and written to probe_schedule_<video>.txt
+    (if the length never arrives, the whole schedule is written when the runner stops).
+
+    Everything time-related goes through `clock`, `player` and `events`, so a simulation can drive the same
+    logic without a thread by calling `begin()`, then `timeout()` / `tick()` as its virtual time advances, and
+    `end()` (see utils/simulation.py).
+    """
+
+    onset_timeout = 0.5  # s, how long to wait for the audio engine to report the ding's onset
+    max_response = 10  # s, answers later than this after the ding do not count
+
+    def __init__(self, queue: ResponseChannel, player, events, video: str, is_demo=False, log=print,
+                 schedule: probe_schedule.ProbeSchedule = None, play_sound=None, on_alert=None, on_finished=None,
+                 clock=clocks.SYSTEM, output_dir="./output"):
+        """
+        :param player: object with get_time() (ms), the media player itself (vlc.MediaPlayer): it confirms the media
+                       time of each probe independently of the events that scheduled it
+        :param events: object with subscribe(listener) / unsubscribe(listener), e.g. the session's PlayerMonitor
+        :param play_sound: plays the ding; may return an audio.Playback to report the onset
+        :param on_alert: demo only, called when a probe got no answer within max_response
+        :param on_finished: called once the runner stopped, before the log file is closed
+        """
+        super().__init__()
+        self.event = Event()
+        self.end_event = Event()
+        self.queue = queue
+        self.player = player
+        self.events = events
+        self.video = video
+        self.is_demo: bool = is_demo
+        self.log = log
+        self.schedule = schedule if schedule is not None else probe_schedule.ProbeSchedule.build()
+        self.play_sound = play_sound
+        self.on_alert = on_alert
+        self.on_finished = on_finished
+        self.clock = clock
+        self.output_path = os.path.join(output_dir, "probe_%s.txt" % video)
+        self.schedule_path = os.path.join(output_dir, "probe_schedule_%s.txt" % video)
+
+        self.cond = Condition()
+        self.media_time = 0  # ms, last reported media time
+        self.media_clock = clock.monotonic()  # when media_time was reported
+        self.due = None  # ms, media time of the next probe
+        self.playing = False
+        self.ended = False
+        self.length = None  # ms, from the first LENGTH_CHANGED
+        self.schedule_written = False
+
+        self.output = None
+        self.clock_before = 0
+        self.ding = 0  # when the last ding was heard: its audio onset if known
+        self.last_probe = None
+        self.added = True
+        self.jitters = []
+        self.response_times = []  # ms from the ding to the key press
+        self.latency = LatencyStats()  # ms from the key press to its registration here
+
+        # Subscribed before the media starts, so PLAYING is never missed
+        self.events.subscribe(self.onPlayerEvent)
+
+    def execute(self):
+        self.event.set()
+
+    def finish(self, timeout=None):
+        self.event.clear()
+        with self.cond:
+            self.cond.notify_all()
+        self.end_event.wait(timeout=timeout)
+
+    def onPlayerEvent(self, kind: str, value: int):
+        # Runs on a VLC thread: only record the state here, never call back into libvlc
+        with self.cond:
+            if kind == player_events.TIME_CHANGED:
+                self.media_time = value
+                self.media_clock = self.clock.monotonic()
+                if self.due is None or self.media_time < self.due:
+                    return
+            elif kind == player_events.LENGTH_CHANGED:
+                if value <= 0 or self.length is not None:
+                    return
+                self.length = value
+            elif kind == player_events.PLAYING:
+                self.playing = True
+                self.media_clock = self.clock.monotonic()
+            elif kind == player_events.PAUSED:
+                self.playing = False
+            else:  # STOPPED, ENDED, ERROR
+                self.playing = False
+                self.ended = True
+            self.cond.notify_all()
+
+    def mediaTime(self, now: float) -> float:
+        """
+        :param now: clock.monotonic()
+        :return: media time (ms) extrapolated from the last report
+        """
+        if self.playing:
+            return self.media_time + (now - self.media_clock) * 1000
+        return self.media_time
+
+    def done(self) -> bool:
+        return self.ended or not self.event.is_set()
+
+    def writeSchedule(self, length: int = None):
+        """
+        :param length: media length (ms), None if unknown
+        """
+        if length is not None:
+            self.schedule.truncate(length)
+        self.schedule.write(self.schedule_path)
+        self.log("probeSchedule,%s,%s,%d" % (self.video, self.schedule.policy, len(self.schedule.times)))
+        self.schedule_written = True
+
+    def begin(self):
+        self.output = probe_log.ProbeLogWriter(self.output_path, clock=self.clock)
+
+    def timeout(self):
+        """
+        Call with `cond` held.
+
+        :return: seconds until `tick()` is needed again, None to wait for the next event
+        """
+        probe_at = self.schedule.next()
+        self.due = probe_at
+        timeouts = []
+        if self.playing and probe_at is not None:
+            timeouts.append((probe_at - self.mediaTime(self.clock.monotonic())) / 1000)
+        if not self.added:
+            # End of the response window (demo alert deadline); answers wake the thread themselves
+            timeouts.append(max(self.clock_before + self.max_response - self.clock.time(), 0.))
+        if self.output.flush_deadline() is not None:
+            timeouts.append(max(self.output.flush_deadline() - self.clock.monotonic(), 0.))
+        if not self.queue.empty():  # arrived while the previous round was processed
+            timeouts.append(0.)
+        if self.length is not None and not self.schedule_written:
+            timeouts.append(0.)
+        return min(timeouts) if timeouts else None
+
+    def tick(self) -> bool:
+        """
+        Fire the probe if it is due, collect answers and flush the log.
+
+        :return: False if the player failed and the runner has to stop
+        """
+        if self.length is not None and not self.schedule_written:
+            self.writeSchedule(self.length)
+
+        with self.cond:
+            probe_at = self.schedule.next()
+            due = self.playing and probe_at is not None and self.mediaTime(self.clock.monotonic()) >= probe_at
+
+        clock_now = self.clock.time()
+
+        # Play ding sound
+        if due:
+            try:
+                time_now = self.player.get_time()
+            except Exception as e:
+                self.output.error(str(e))
+                return False
+            with self.cond:
+                self.media_time = time_now
+                self.media_clock = self.clock.monotonic()
+
+            probe_at = self.schedule.pop(time_now)
+            if probe_at is not None:
+                playback = self.play_sound() if self.play_sound is not None else None
+                onset = float('nan')
+                if playback is not None and playback.started.wait(self.onset_timeout):
+                    onset = playback.onset
+                jitter = time_now - probe_at
+                self.output.sound(time_now, clock_now, jitter, probe_at, onset)
+                self.log("probeJitter,%s,%d,%f,%f" % (self.video, self.schedule.fired, jitter,
+                                                       (onset - clock_now) * 1000))
+                self.jitters.append(jitter)
+                self.clock_before = clock_now
+                self.ding = clock_now if math.isnan(onset) else onset
+                self.last_probe = None
+                self.added = False
+
+        # Check demo: Alert if no probing in 10 sec
+        if self.is_demo and (self.last_probe is None) and (not self.added) and \
+                (clock_now - self.clock_before >= self.max_response):
+            if self.on_alert is not None:
+                self.on_alert()
+            self.added = True
+
+        for e in self.queue.drain():
+            if 0. <= e.time - self.clock_before < self.max_response:
+                self.last_probe = e
+        if self.last_probe is not None and not self.added:
+            self.output.probe(self.mediaTime(self.clock.monotonic()), self.last_probe.time, self.last_probe.answer)
+            self.added = True
+            registration = (self.clock.monotonic() - self.last_probe.monotonic) * 1000
+            self.response_times.append((self.last_probe.time - self.ding) * 1000)
+            self.latency.add(registration)
+            self.log("probeResponse,%s,%d,%s,%f,%f" % (self.video, self.schedule.fired, self.last_probe.answer,
+                                                       self.response_times[-1], registration))
+        elif not self.added and not self.is_demo and clock_now - self.clock_before >= self.max_response:
+            self.added = True  # No answer: stop collecting until the next probe
+        self.output.poll()
+        return True
+
+    def end(self):
+        with self.cond:
+            self.due = None
+        self.queue.listen(None)
+        self.events.unsubscribe(self.onPlayerEvent)
+        if not self.schedule_written:
+            length = self.length
+            if length is None:
+                try:
+                    length = self.player.get_length()
+                except Exception as e:
+                    self.log("probeScheduleLength,%s,%s" % (self.video, e))
+            self.writeSchedule(length if length is not None and length > 0 else None)
+        if self.jitters:
+            self.log("probeJitterSummary,%s,%d,%f,%f,%f,%d" % (self.video, len(self.jitters), min(self.jitters),
+                                                               sum(self.jitters) / len(self.jitters),
+                                                               max(self.jitters), self.schedule.skipped))
+        if self.response_times:
+            self.log("probeResponseSummary,%s,%d,%d,%f,%s" % (self.video, self.schedule.fired,
+                                                              len(self.response_times),
+                                                              sum(self.response_times) / len(self.response_times),
+                                                              self.latency.format()))
+
+        if self.on_finished is not None:
+            self.on_finished()
+        self.output.close()
+        self.end_event.set()
+
+    def run(self) -> None:
+        self.begin()
+
+        self.event.wait()
+        self.queue.listen(self.cond)
+
+        with self.cond:
+            while not (self.playing or self.ended) and self.event.is_set():
+                self.cond.wait()
+
+        while True:
+            with self.cond:
+                if self.done():
+                    break
+                timeout = self.timeout()
+                if timeout is None or timeout > 0:
+                    self.cond.wait(timeout)
+                if self.done():
+                    break
+            if not self.tick():
+                break
+
+        self.end()
@@ -0,0 +1,120 @@
+import heapq
+import random
+
+from typing import List, Optional
+
+FIXED = "fixed"  # padding + k * interval, identical for everyone (the original schedule)
+JITTERED = "jittered"  # fixed slots shifted by up to +-jitter
+UNIFORM = "uniform"  # one probe at a uniformly random time in each interval slot
+EXPONENTIAL = "exponential"  # memoryless gaps with mean `interval`, never shorter than `min_gap`
+POLICIES = (FIXED, JITTERED, UNIFORM, EXPONENTIAL)
+
+HORIZON = 3 * 60 * 60 * 1000  # ms, used when the video length is not known in advance
+
+
+def generate(policy=FIXED, seed=None, length: int = None, padding=5000, interval=40000, jitter=None,
+             min_gap=10000) -> List[int]:
+    """
+    :param policy: one of POLICIES
+    :param seed: anything random.seed() accepts, e.g. "<user_id>,<video>" for per-participant schedules
+    :param length: video length (ms); probes are generated up to HORIZON if None
+    :param padding: (ms) no probe before padding + interval, as in the original schedule
+    :param interval: (ms) mean distance between probes
+    :param jitter: (ms) JITTERED only, default interval / 4
+    :param min_gap: (ms) smallest distance between probes, so response windows never overlap
+    :return: sorted probe times (ms of media time)
+    """
+    if policy not in POLICIES:
+        raise ValueError("Unknown probe policy: %r" % policy)
+    rng = random.Random(seed)
+    end = length if length is not None and length > 0 else HORIZON
+    slots = range(padding + interval, end, interval)
+
+    if policy == FIXED:
+        times = list(slots)
+    elif policy == JITTERED:
+        jitter = min(interval / 4 if jitter is None else jitter, (interval - min_gap) / 2)
+        times = [int(t + rng.uniform(-jitter, jitter)) for t in slots]
+    elif policy == UNIFORM:
+        # Slot k covers [t_k - interval, t_k), keeping min_gap free at its end
+        times = [int(t - interval + rng.uniform(0, interval - min_gap)) for t in slots]
+        times = [t for t in times if t >= padding]
+    else:
+        times = []
+        t = padding + min_gap + rng.expovariate(1. / max(interval - min_gap, 1))
+        while t < end:
+            times.append(int(t))
+            t += min_gap + rng.expovariate(1. / max(interval - min_gap, 1))
+    return sorted(times)
+
+
+class ProbeSchedule:
+    """
+    Precomputed probe times of one video, consumed in order as playback advances.
+    Checking whether a probe is due is O(1); firing one is O(log n).
+    """
+
+    def __init__(self, times: List[int], policy=FIXED, seed=None):
+        self.times = sorted(times)
+        self.policy = policy
+        self.seed = seed
+        self.heap = list(self.times)  # a sorted list already is a heap
+        self.fired = 0
+        self.skipped = 0
+
+    @classmethod
+    def build(cls, policy=FIXED, seed=None, length: int = None, **kwargs) -> "ProbeSchedule":
+        return cls(generate(policy, seed, length, **kwargs), policy, seed)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def next(self) -> Optional[int]:
+        """
+        :return: media time (ms) of the next pending probe, None when the schedule is exhausted
+        """
+        return self.heap[0] if self.heap else None
+
+    def pop(self, media_time: float) -> Optional[int]:
+        """
+        Consume every probe scheduled at or before `media_time`. Probes passed over at once (e.g. by seeking)
+        collapse into a single one and are counted as skipped.
+
+        :return: scheduled time (ms) of the latest due probe, None if nothing is due
+        """
+        due = None
+        while self.heap and self.heap[0] <= media_time:
+            if due is not None:
+                self.skipped += 1
+            due = heapq.heappop(self.heap)
+        if due is not None:
+            self.fired += 1
+        return due
+
+    def truncate(self, length: int) -> int:
+        """
+        Drop the probes at or after the end of the video, e.g. once its length is known.
+
+        :param length: video length (ms)
+        :return: number of probes dropped
+        """
+        before = len(self.times)
+        self.times = [t for t in self.times if t < length]
+        self.heap = [t for t in self.heap if t < length]
+        heapq.heapify(self.heap)
+        return before - len(self.times)
+
+    def write(self, path: str):
+        """
+        One scheduled probe time (ms) per line, after a "#policy,seed" header.
+        """
+        with open(path, 'w', encoding='UTF-8') as output:
+            output.write("#%s,%s\n" % (self.policy, self.seed))
+            for t in self.times:
+                output.write("%d\n" % t)
+
+
+def load(path: str) -> ProbeSchedule:
+    with open(path, 'r', encoding='UTF-8') as f:
+        policy, _, seed = f.readline()[1:].rstrip("\n").partition(",")
+        return ProbeSchedule([int(line) for line in f if line.strip()], policy, seed)
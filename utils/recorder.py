@@ -0,0 +1,316 @@
+from multiprocessing import Event, Process, Value
+from threading import Thread, Lock
+import traceback
+import signal
+import time
+import sys
+import os
+
+import cv2
+
+from utils import codec, frame_source, spool, timeline
+from utils.frame_buffer import FrameRingBuffer
+from utils.frame_bus import FrameBus
+from utils.segments import SegmentedWriter
+from utils.recorder_stats import RecorderStats
+from utils.governor import Governor, DEFAULT_LEVELS
+
+
+class VideoRecorder(Thread):
+    buffer_size = 64  # frames (~2 s at 30 fps)
+    segment_seconds = 600.0  # rotate recording files every 10 min (and at every video)
+    spool_jpeg_quality = None  # spool mode: None stores raw frames, otherwise JPEG quality (e.g. 95)
+    stats_interval = 30.0  # s
+    roi_size = 256  # face-ROI mode: side of the encoded face crop (px)
+    full_frame_every = 6  # face-ROI mode: keep every 6th full frame (5 fps at 30 fps)
+    governor_levels = DEFAULT_LEVELS  # allowed (scale, frame divisor) steps under CPU pressure
+    governor_interval = 1.0  # s
+    use_pos_msec = True  # also record the backend's CAP_PROP_POS_MSEC frame timestamp when it provides one
+
+    def __init__(self, cam, log=print, video_codec=codec.DEFAULT, output_dir="./output", share_frames=False,
+                 spool=False, roi=False, adaptive=True):
+        """
+        :param cam: camera index, frame source spec (see frame_source.open_source), or an already opened FrameSource;
+                    the recorder takes ownership and releases it when done.
+        :param share_frames: also publish every captured frame on a shared-memory FrameBus (`self.frame_bus`)
+                             for previews and online analysis in other threads or processes.
+        :param spool: defer encoding; frames are spooled to disk and encoded by `encodeSpool()` after recording.
+        :param roi: face-ROI mode; encode a stabilized `roi_size` face crop of every frame to recording_face_*
+                    and only every `full_frame_every`-th full frame to recording_*. Crop boxes go to the timeline.
+                    Not combined with `spool`.
+        :param adaptive: let a Governor lower resolution / frame rate within `governor_levels` when the encoder
+                         falls behind (plain recording mode only). Every change starts a new segment and is logged.
+        """
+        super().__init__()
+        self.event = Event()
+        self.proceed_event = Event()
+        self.cam = cam
+        self.output_dir = output_dir
+        self.log = log
+        self.video_codec = video_codec
+        self.video_timeline: timeline.TimelineWriter = None
+        self.video_cap = None
+        self.video_out = None  # SegmentedWriter or spool.SpoolWriter
+        self.buffer: FrameRingBuffer = None
+        self.capture_thread: Thread = None
+        self.share_frames = share_frames
+        self.frame_bus: FrameBus = None
+        self.roi = roi
+        self.spool = spool and not roi
+        self.roi_out: SegmentedWriter = None
+        self.face_tracker = None  # face_roi.FaceTracker (imported on demand, it needs dlib)
+        self.governor = Governor(self.governor_levels) if adaptive and not (spool or roi) else None
+        self.frame_size = None
+        self.encode_size = None
+        self.stats = RecorderStats()  # whole session
+        self.window_stats = RecorderStats()  # since the last periodic report
+        self.window_lock = Lock()  # window_stats is fed by both threads and reset by the encoder
+        self.frame_base = 0  # capture index at the last setFrameCount()
+        self.range_begin = None  # (capture index, time) of the open frame range
+        self.frame_ranges = []  # (label, first capture index, last capture index, start time, end time)
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+
+    def signal_handler(self, sig, frame):
+        if sig == signal.SIGINT:
+            traceback.print_stack(frame)
+            print("SIGINT FROM CHILD!", flush=True)
+
+        if self.video_timeline is not None:
+            self.video_timeline.close(time.time(), time.monotonic())
+        if self.video_out is not None:
+            self.video_out.release()
+        if self.roi_out is not None:
+            self.roi_out.release()
+
+        self.event.set()
+        sys.exit(0)
+
+    def execute(self):
+        self.event.set()
+        self.proceed_event.wait()
+
+    def finish(self, timeout=None):
+        if not self.is_alive():
+            return
+        self.event.clear()
+        self.event.wait(timeout=timeout)
+
+    def captureIndex(self) -> int:
+        """
+        Index the next captured frame will get (the `capture` field of the timeline), counting dropped frames.
+        Only the capture thread advances it, so reading it needs no lock.
+        """
+        return self.buffer.captured if self.buffer is not None else 0
+
+    def setFrameCount(self):
+        self.frame_base = self.captureIndex()
+
+    def getFrameCount(self):
+        return self.captureIndex() - self.frame_base
+
+    def beginFrameRange(self):
+        self.range_begin = (self.captureIndex(), time.time())
+
+    def endFrameRange(self, label: str):
+        """
+        Close the range opened by `beginFrameRange()`.
+
+        :return: (label, first capture index, last capture index, start time, end time)
+        """
+        first, start = self.range_begin
+        frame_range = (label, first, self.captureIndex() - 1, start, time.time())
+        self.frame_ranges.append(frame_range)
+        self.range_begin = None
+        return frame_range
+
+    def spoolPath(self):
+        return os.path.join(self.output_dir, "recording.spool")
+
+    def encodeSpool(self):
+        """
+        Encode the spooled recording in a background process. Call once the thread has exited (`finish()`, then
+        `join()`), so the spool and its index are complete.
+
+        :return: (process, progress Value in 0..1)
+        """
+        progress = Value('d', 0.)
+        process = Process(target=spool.encode_spool,
+                          args=(self.spoolPath(), self.video_codec, os.path.join(self.output_dir, "recording"),
+                                30.0, self.segment_seconds, progress))
+        process.start()
+        return process, progress
+
+    def newSegment(self, reason: str):
+        if self.video_out is not None:
+            self.video_out.rotate(reason)
+        if self.roi_out is not None:
+            self.roi_out.rotate(reason)
+
+    def logBufferStats(self, tag="buffer"):
+        self.log("videoRecorder,%s,%d,%d,%d,%d" % (tag, self.buffer.high_water, self.buffer.dropped,
+                                                   self.buffer.written, self.buffer.capacity))
+
+    def logStats(self, final=False):
+        """
+        videoStats,<window|total>,fps,frames,read(mean,p95,max),encode(...),interval(...),interval histogram
+        """
+        if final:
+            self.log("videoStats,total,%s" % self.stats.format())
+            self.logBufferStats("bufferEnd")
+        else:
+            with self.window_lock:
+                window = self.window_stats.format()
+                self.window_stats.reset()
+            self.log("videoStats,window,%s" % window)
+            self.logBufferStats()
+
+    def capture(self) -> None:
+        """
+        Capture thread: only grabs frames into the ring buffer so that encoder stalls never block the camera.
+        Frames are stamped right after grab(), before retrieve() decodes them.
+        """
+        while self.event.is_set():
+            slot = self.buffer.acquire()
+            grabbed = self.video_cap.grab()
+            curr_time = time.time()
+            curr_mono = time.monotonic()
+            if not grabbed:
+                continue
+            pos_msec = self.video_cap.get(cv2.CAP_PROP_POS_MSEC) if self.use_pos_msec else 0.
+            read_start = time.perf_counter()
+            ret, frame = self.video_cap.retrieve(self.buffer.scratch if slot is None else slot)
+            read_ms = (time.perf_counter() - read_start) * 1000
+            if not ret or frame is None:
+                continue
+            self.stats.add_capture(read_ms, curr_mono)
+            with self.window_lock:
+                self.window_stats.add_capture(read_ms, curr_mono)
+            if slot is None:
+                self.buffer.drop()
+                continue
+            if frame is not slot:
+                if frame.shape != slot.shape:
+                    self.buffer.drop()
+                    continue
+                slot[...] = frame
+            self.buffer.commit(curr_time, curr_mono, pos_msec if pos_msec > 0 else float('nan'))
+            if self.frame_bus is not None:
+                self.frame_bus.publish(slot, curr_time)
+        self.buffer.close()
+
+    def encode(self, frame, frame_idx: int, capture_idx: int, curr_time: float, curr_mono: float, pos_msec: float):
+        if self.face_tracker is None:
+            if self.encode_size != self.frame_size:
+                frame = cv2.resize(frame, self.encode_size, interpolation=cv2.INTER_AREA)
+            self.video_out.write(frame, frame_idx, curr_time)
+            self.video_timeline.append(frame_idx, curr_time, curr_mono, pos_msec, capture=capture_idx)
+            return
+
+        x, y, w, h = self.face_tracker.crop_box()
+        self.roi_out.write(cv2.resize(frame[y:y + h, x:x + w], (self.roi_size, self.roi_size),
+                                      interpolation=cv2.INTER_AREA), frame_idx, curr_time)
+        full = frame_idx % self.full_frame_every == 0
+        if full:
+            self.video_out.write(frame, frame_idx, curr_time)
+        self.video_timeline.append(frame_idx, curr_time, curr_mono, pos_msec, (x, y, w, h), full, capture_idx)
+
+    def updateGovernor(self, captured: int, encoded: int):
+        reason = self.governor.update(time.monotonic(), len(self.buffer) / self.buffer.capacity, captured, encoded)
+        if reason is None:
+            return
+        level = self.governor.level
+        w, h = self.frame_size
+        self.encode_size = (int(w * level.scale) // 2 * 2, int(h * level.scale) // 2 * 2)
+        self.video_out.reconfigure(self.encode_size, 30.0 / level.divisor, "governor")
+        self.log("videoGovernor,%f,%d,%d,%d,%d,%s" % (time.time(), self.governor.index, self.encode_size[0],
+                                                      self.encode_size[1], level.divisor, reason))
+
+    def run(self) -> None:
+        self.video_timeline = timeline.TimelineWriter(os.path.join(self.output_dir, "video_timeline.bin"))
+        if isinstance(self.cam, frame_source.FrameSource):
+            self.video_cap = self.cam  # already opened and configured (handed over by the camera check)
+        else:
+            self.video_cap = frame_source.open_source(self.cam)
+            self.video_cap.set(cv2.CAP_PROP_FPS, 30)
+        
+        size = (int(self.video_cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self.video_cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+        assert(self.video_cap.isOpened())
+        self.frame_size = self.encode_size = size
+        
+        if self.spool:
+            self.video_out = spool.SpoolWriter(self.spoolPath(), (size[1], size[0], 3), self.spool_jpeg_quality)
+            self.log("videoRecorder,output,spool,%s" % ("raw" if self.spool_jpeg_quality is None else "jpeg"))
+        elif self.roi:
+            self.video_out = SegmentedWriter(self.video_codec, os.path.join(self.output_dir, "recording"),
+                                             30.0 / self.full_frame_every, size, self.segment_seconds)
+            self.roi_out = SegmentedWriter(self.video_codec, os.path.join(self.output_dir, "recording_face"), 30.0,
+                                           (self.roi_size, self.roi_size), self.segment_seconds)
+            self.log("videoRecorder,output,roi,%s,%d,%d" % (self.video_codec[0], self.roi_size, self.full_frame_every))
+        else:
+            self.video_out = SegmentedWriter(self.video_codec, os.path.join(self.output_dir, "recording"), 30.0, size,
+                                             self.segment_seconds)
+            self.log("videoRecorder,output,%s,%s" % (self.video_codec[0], self.video_codec[2]))
+        self.buffer = FrameRingBuffer((size[1], size[0], 3), self.buffer_size)
+        if self.share_frames or self.roi:
+            self.frame_bus = FrameBus((size[1], size[0], 3), shared=self.share_frames)
+            if self.share_frames:
+                self.log("videoRecorder,frameBus,%s" % self.frame_bus.name)
+        if self.roi:
+            from utils.face_roi import FaceTracker
+            self.face_tracker = FaceTracker(self.frame_bus, size)
+            self.face_tracker.start()
+        self.event.wait()
+        self.capture_thread = Thread(target=self.capture)
+        self.capture_thread.daemon = True
+        self.capture_thread.start()
+        self.proceed_event.set()
+
+        # Encoder: drain the ring buffer until capture stops and every captured frame is written
+        last_stats = time.time()
+        last_governor = time.monotonic()
+        governor_written = governor_encoded = 0
+        frame_idx = 0
+        taken = 0
+        while not self.buffer.is_drained():
+            item = self.buffer.get(timeout=0.5)
+            if item is not None:
+                taken += 1
+                if self.governor is not None and (taken - 1) % self.governor.level.divisor != 0:
+                    self.buffer.release()  # frame rate reduced by the governor
+                    continue
+                frame, curr_time, curr_mono, pos_msec, capture_idx = item
+                encode_start = time.perf_counter()
+                self.encode(frame, frame_idx, capture_idx, curr_time, curr_mono, pos_msec)
+                encode_ms = (time.perf_counter() - encode_start) * 1000
+                self.stats.add_encode(encode_ms)
+                with self.window_lock:
+                    self.window_stats.add_encode(encode_ms)
+                frame_idx += 1
+                self.buffer.release()
+            if self.governor is not None and time.monotonic() - last_governor >= self.governor_interval:
+                self.updateGovernor(self.buffer.written - governor_written, frame_idx - governor_encoded)
+                governor_written, governor_encoded = self.buffer.written, frame_idx
+                last_governor = time.monotonic()
+            if time.time() - last_stats >= self.stats_interval:
+                self.logStats()
+                last_stats = time.time()
+        self.capture_thread.join()
+        self.logStats(final=True)
+        self.video_timeline.close(time.time(), time.monotonic())
+        self.video_out.release()
+        if self.roi_out is not None:
+            self.roi_out.release()
+        if self.face_tracker is not None:
+            self.face_tracker.stop()
+            self.face_tracker.join()
+            self.log("videoRecorder,faceTracker,%d,%d" % (self.face_tracker.detections, self.face_tracker.misses))
+        self.video_cap.release()
+        if self.frame_bus is not None:
+            self.frame_bus.close()
+        # Legacy text timeline for existing analysis scripts
+        timeline.to_text(os.path.join(self.output_dir, "video_timeline.bin"),
+                         os.path.join(self.output_dir, "video_timeline.txt"))
+        self.event.set()
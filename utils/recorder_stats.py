@@ -0,0 +1,96 @@
+from bisect import bisect_right
+
+# Histogram bin edges in ms. At 30 fps frames should land in the 30-40 ms bin.
+EDGES_MS = (5, 10, 20, 30, 40, 50, 67, 100, 200, 500)
+
+
+class LatencyStats:
+    """
+    Running count / mean / max and a fixed-bin histogram of millisecond samples. O(1) per sample.
+    """
+
+    def __init__(self, edges=EDGES_MS):
+        self.edges = edges
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.edges) + 1)
+        self.n = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, ms: float):
+        self.counts[bisect_right(self.edges, ms)] += 1
+        self.n += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def mean(self):
+        return self.total / self.n if self.n else 0.
+
+    def percentile(self, q: float):
+        """
+        q-th percentile, interpolated linearly within its bin and never above the largest sample.
+        """
+        if self.n == 0:
+            return 0.
+        target = q / 100. * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= target:
+                low = float(self.edges[i - 1]) if i > 0 else 0.
+                high = float(self.edges[i]) if i < len(self.edges) else self.max
+                return min(low + (high - low) * (target - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def format(self):
+        return "%.2f,%.1f,%.2f" % (self.mean(), self.percentile(95), self.max)
+
+
+class RecorderStats:
+    """
+    Per-frame read latency (retrieve(), i.e. decoding the grabbed frame), encode latency and inter-frame interval
+    of VideoRecorder. The capture thread only touches `read`/`interval`, the encoder only `encode`; `reset()`
+    touches everything, so a stats object that is reset while capturing needs a lock.
+    """
+
+    def __init__(self):
+        self.read = LatencyStats()
+        self.encode = LatencyStats()
+        self.interval = LatencyStats()
+        self.frames = 0
+        self.first = None
+        self.last = None
+
+    def reset(self):
+        self.read.reset()
+        self.encode.reset()
+        self.interval.reset()
+        self.frames = 0
+        self.first = self.last
+
+    def add_capture(self, read_ms: float, monotonic: float):
+        self.read.add(read_ms)
+        if self.last is not None:
+            self.interval.add((monotonic - self.last) * 1000)
+        if self.first is None:
+            self.first = monotonic
+        self.last = monotonic
+        self.frames += 1
+
+    def add_encode(self, encode_ms: float):
+        self.encode.add(encode_ms)
+
+    def fps(self):
+        if self.first is None or self.last is None or self.last <= self.first:
+            return 0.
+        return self.interval.n / (self.last - self.first)
+
+    def format(self):
+        """
+        fps,frames,read(mean,p95,max),encode(mean,p95,max),interval(mean,p95,max),interval histogram
+        """
+        return "%.2f,%d,%s,%s,%s,%s" % (self.fps(), self.frames, self.read.format(), self.encode.format(),
+                                         self.interval.format(), ";".join(str(c) for c in self.interval.counts))
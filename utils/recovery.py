@@ -0,0 +1,52 @@
+import glob
+import os
+import shutil
+import sys
+import time
+
+from utils import activity_log, probe_log, timeline
+
+
+def interrupted(output_dir="./output") -> bool:
+    """
+    :return: True if `output_dir` holds logs of a session that did not end normally
+    """
+    for sidecar in glob.glob(os.path.join(output_dir, "probe_*.bin")):
+        if not probe_log.load_probe_log(sidecar)[1]:
+            return True
+    for path in glob.glob(os.path.join(output_dir, "**", "video_timeline.bin"), recursive=True) + \
+            glob.glob(os.path.join(output_dir, "mouse_log_*.bin")) + \
+            glob.glob(os.path.join(output_dir, "keyboard_log_*.bin")):
+        if not os.path.exists(os.path.splitext(path)[0] + ".txt"):
+            return True
+    return False
+
+
+def archive_interrupted(output_dir="./output", archive_root="./"):
+    """
+    Move the files of an interrupted session out of `output_dir` before the next session overwrites them
+    (and zips them with its own). Call before anything in `output_dir` is opened.
+
+    :return: the archive directory, None if there was nothing to archive
+    """
+    if not os.path.isdir(output_dir) or not interrupted(output_dir):
+        return None
+    archive_dir = os.path.join(archive_root, "output_interrupted_%s" % time.strftime("%Y%m%d_%H%M%S"))
+    shutil.move(output_dir, archive_dir)
+    os.mkdir(output_dir)
+    return archive_dir
+
+
+def recover(archive_dir: str):
+    """
+    Rebuild the text logs of an archived session from their binary files.
+
+    :return: paths of the text logs written
+    """
+    return probe_log.recover_all(archive_dir) + timeline.convert_all(archive_dir) + \
+        activity_log.convert_all(archive_dir)
+
+
+if __name__ == '__main__':
+    for p in recover(sys.argv[1] if len(sys.argv) > 1 else "./output"):
+        print("recovered,%s" % p)
@@ -0,0 +1,60 @@
+from collections import deque
+from threading import Condition
+import time
+
+from typing import List, NamedTuple, Optional
+
+
+class Response(NamedTuple):
+    time: float  # time.time() when the key was released
+    answer: str  # 'y', 'n' or 'p'
+    monotonic: float  # time.monotonic() when the key was released
+
+
+class ResponseChannel:
+    """
+    Hands probe answers from the keyboard listener to ProbeRunner. Both run as threads of this process, so a
+    deque under a condition is enough: no pipe, no pickling.
+
+    A consumer that already sleeps on its own condition (ProbeRunner waits for VLC events) registers it with
+    `listen()` and is woken by every `put()` as well.
+    """
+
+    def __init__(self):
+        self.cond = Condition()
+        self.items = deque()
+        self.listener: Optional[Condition] = None
+
+    def put(self, timestamp: float, answer: str, monotonic: float = None):
+        response = Response(timestamp, answer, time.monotonic() if monotonic is None else monotonic)
+        with self.cond:
+            self.items.append(response)
+            self.cond.notify_all()
+            listener = self.listener
+        if listener is not None:
+            with listener:
+                listener.notify_all()
+
+    def get(self, timeout=None) -> Optional[Response]:
+        """
+        Block until a response arrives.
+
+        :return: the oldest response, None on timeout
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items, timeout):
+                return None
+            return self.items.popleft()
+
+    def drain(self) -> List[Response]:
+        with self.cond:
+            items = list(self.items)
+            self.items.clear()
+        return items
+
+    def empty(self) -> bool:
+        return not self.items
+
+    def listen(self, cond: Optional[Condition]):
+        with self.cond:
+            self.listener = cond
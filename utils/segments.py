@@ -0,0 +1,127 @@
+from threading import Lock
+import csv
+import os
+
+from typing import List, NamedTuple
+
+from utils import codec
+
+INDEX_HEADER = ["segment", "path", "reason", "first_frame", "last_frame", "start_time", "end_time",
+                "width", "height", "fps"]
+
+
+class Segment(NamedTuple):
+    segment: int
+    path: str
+    reason: str
+    first_frame: int
+    last_frame: int
+    start_time: float
+    end_time: float
+    width: int
+    height: int
+    fps: float
+
+
+class SegmentedWriter:
+    """
+    Video writer that rotates to a new file every `segment_seconds` of captured time and whenever `rotate()`
+    is requested. Each finished segment is appended to a CSV index, so a crash only loses the open segment.
+    """
+
+    def __init__(self, video_codec, prefix: str, fps: float, size, segment_seconds: float = None,
+                 index_path: str = None):
+        self.video_codec = video_codec
+        self.prefix = prefix
+        self.fps = fps
+        self.size = size
+        self.segment_seconds = segment_seconds
+
+        self.writer = None
+        self.segment = -1
+        self.path = None
+        self.reason = None
+        self.first_frame = self.last_frame = -1
+        self.start_time = self.end_time = 0.
+        self.pending_reason = "start"  # first segment opens on the first frame
+        self.pending_lock = Lock()  # rotate() may be called from other threads
+
+        self.index = open(index_path or prefix + "_segments.csv", 'w', buffering=1, newline='', encoding='UTF-8')
+        self.index_writer = csv.writer(self.index)
+        self.index_writer.writerow(INDEX_HEADER)
+
+    def isOpened(self):
+        return not self.index.closed
+
+    def rotate(self, reason: str):
+        """
+        Start a new segment at the next written frame. Safe to call from other threads; rotations requested
+        before the same frame share one segment, with their reasons joined by "+".
+        """
+        with self.pending_lock:
+            self.pending_reason = reason if self.pending_reason is None else self.pending_reason + "+" + reason
+
+    def reconfigure(self, size, fps: float, reason: str):
+        """
+        Change frame size / rate from the next written frame on, which always starts a new segment.
+        Call from the writing thread.
+        """
+        self.size = size
+        self.fps = fps
+        self.rotate(reason)
+
+    def _take_pending(self):
+        """
+        :return: the pending rotation reason, cleared atomically, None if there is none
+        """
+        if self.pending_reason is None:  # lock-free fast path: only the writing thread clears it
+            return None
+        with self.pending_lock:
+            reason, self.pending_reason = self.pending_reason, None
+        return reason
+
+    def write(self, frame, frame_idx: int, timestamp: float):
+        reason = self._take_pending()
+        if reason is not None:
+            self._open(reason, frame_idx, timestamp)
+        elif self.segment_seconds and timestamp - self.start_time >= self.segment_seconds:
+            self._open("time", frame_idx, timestamp)
+
+        self.writer.write(frame)
+        self.last_frame = frame_idx
+        self.end_time = timestamp
+
+    def _open(self, reason: str, frame_idx: int, timestamp: float):
+        self._close()
+        self.segment += 1
+        self.writer, self.path = codec.open_writer(self.video_codec, "%s_%03d" % (self.prefix, self.segment),
+                                                   self.fps, self.size)
+        self.segment_size = self.size
+        self.segment_fps = self.fps
+        self.reason = reason
+        self.first_frame = frame_idx
+        self.start_time = timestamp
+
+    def _close(self):
+        if self.writer is None:
+            return
+        self.writer.release()
+        self.writer = None
+        self.index_writer.writerow([self.segment, os.path.basename(self.path), self.reason,
+                                    self.first_frame, self.last_frame,
+                                    "%f" % self.start_time, "%f" % self.end_time,
+                                    self.segment_size[0], self.segment_size[1], "%g" % self.segment_fps])
+
+    def release(self):
+        if self.index.closed:
+            return
+        self._close()
+        self.index.close()
+
+
+def load_index(path: str) -> List[Segment]:
+    with open(path, newline='', encoding='UTF-8') as f:
+        return [Segment(int(row["segment"]), row["path"], row["reason"], int(row["first_frame"]),
+                        int(row["last_frame"]), float(row["start_time"]), float(row["end_time"]),
+                        int(row["width"]), int(row["height"]), float(row["fps"]))
+                for row in csv.DictReader(f)]
@@ -0,0 +1,270 @@
+import heapq
+import math
+import os
+import random
+import time
+
+from threading import Event
+from typing import List, NamedTuple
+
+import numpy as np
+
+from utils import player_events, probe_log, probe_schedule
+from utils.clock import VirtualClock
+from utils.player_monitor import PlayerMonitor
+from utils.probe_runner import ProbeRunner
+from utils.response_channel import ResponseChannel
+from utils.time_label import TimeLabel
+
+
+class FakePlayer:
+    """
+    Stands in for vlc.MediaPlayer and its events on a VirtualClock: the media starts `start_delay`
+    seconds after `play()`, reports its time every `time_interval` seconds like VLC, and ends after `length` ms
+    of playback.
+    """
+
+    def __init__(self, clock: VirtualClock, length: int, start_delay=0.5, time_interval=0.25):
+        self.clock = clock
+        self.length = length
+        self.start_delay = start_delay
+        self.time_interval = time_interval
+        self.listeners = []
+
+        self.position = 0.  # ms, media time at `since`
+        self.since = None  # clock.monotonic() playback (re)started, None while not playing
+        self.start_at = None  # pending start
+        self.next_report = None
+        self.ended = False
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def emit(self, kind: str, value=0):
+        for listener in list(self.listeners):
+            listener(kind, value)
+
+    def get_time(self) -> int:
+        if self.since is None:
+            return int(self.position)
+        return int(min(self.position + (self.clock.monotonic() - self.since) * 1000, self.length))
+
+    def get_length(self) -> int:
+        return self.length
+
+    def is_playing(self) -> bool:
+        return self.since is not None
+
+    def play(self, delay: float = None):
+        if self.since is None and not self.ended:
+            self.start_at = self.clock.monotonic() + (self.start_delay if delay is None else delay)
+
+    def pause(self):
+        if self.since is not None:
+            self.position = self.get_time()
+            self.since = None
+            self.emit(player_events.PAUSED)
+
+    def end_time(self):
+        return self.since + (self.length - self.position) / 1000
+
+    def next_event(self):
+        """
+        :return: clock.monotonic() of the next event, None if none is pending
+        """
+        if self.ended:
+            return None
+        if self.since is None:
+            return self.start_at
+        return min(self.next_report, self.end_time())
+
+    def advance(self):
+        """
+        Deliver every event due at the clock's current time.
+        """
+        now = self.clock.monotonic()
+        if self.since is None and self.start_at is not None and now >= self.start_at:
+            self.start_at = None
+            self.since = now
+            self.next_report = now + self.time_interval
+            if self.position == 0:
+                self.emit(player_events.LENGTH_CHANGED, self.length)
+            self.emit(player_events.PLAYING)
+        if self.since is None:
+            return
+        if now >= self.end_time():
+            self.position = self.length
+            self.since = None
+            self.ended = True
+            self.emit(player_events.TIME_CHANGED, self.length)
+            self.emit(player_events.ENDED)
+            return
+        while now >= self.next_report:
+            self.next_report += self.time_interval
+            self.emit(player_events.TIME_CHANGED, self.get_time())
+
+
+class SimulatedPlayback:
+    """
+    What sound.play() returns for a preloaded cue: the onset is known once the sound started.
+    """
+
+    def __init__(self, onset: float):
+        self.onset = onset
+        self.started = Event()
+        self.started.set()
+
+
+class Participant:
+    """
+    Answers a probe with probability `answer_rate`, `response_mean` seconds (log-normal) after hearing it.
+    """
+
+    def __init__(self, seed=None, answer_rate=0.9, response_mean=1.5, response_sigma=0.4, yes_rate=0.7):
+        self.rng = random.Random(seed)
+        self.answer_rate = answer_rate
+        self.response_mean = response_mean
+        self.response_sigma = response_sigma
+        self.yes_rate = yes_rate
+
+    def respond(self, onset: float):
+        """
+        :param onset: clock.monotonic() the ding was heard
+        :return: (clock.monotonic() of the key press, answer) or None
+        """
+        if self.rng.random() >= self.answer_rate:
+            return None
+        mu = math.log(self.response_mean) - self.response_sigma ** 2 / 2
+        delay = self.rng.lognormvariate(mu, self.response_sigma)
+        return onset + delay, 'y' if self.rng.random() < self.yes_rate else 'n'
+
+
+class VideoReport(NamedTuple):
+    video: str
+    length: int  # ms
+    scheduled: int
+    fired: int
+    skipped: int
+    answered: int
+    jitter_mean: float  # ms, probe fire time past the scheduled media time
+    jitter_max: float
+    onset_mean: float  # ms, ding onset past the request
+    response_mean: float  # ms, key press past the ding onset
+    label_ticks: int
+    label_updates: int
+    label_lag: str  # mean, p95, max (ms) of the time label behind the media second
+
+
+def simulate_video(clock: VirtualClock, video: str, length: int, schedule: probe_schedule.ProbeSchedule,
+                   output_dir: str, participant: Participant, is_demo=False, log=print, audio_latency=20.,
+                   dialog_seconds=3.) -> VideoReport:
+    """
+    Run one video through ProbeRunner and the time label on a virtual clock, with the same output files as a
+    real session.
+
+    :param length: video length (ms)
+    :param audio_latency: (ms) simulated delay from sound.play() to the ding's onset
+    :param dialog_seconds: demo only, how long the "did you hear the beep" dialog pauses the video
+    """
+    player = FakePlayer(clock, length)
+    channel = ResponseChannel()
+    keys = []  # heap of (clock.monotonic(), answer)
+
+    def play_sound():
+        onset = clock.monotonic() + audio_latency / 1000
+        response = participant.respond(onset)
+        if response is not None:
+            heapq.heappush(keys, response)
+        return SimulatedPlayback(clock.epoch + onset)
+
+    def on_alert():
+        player.pause()
+        player.play(dialog_seconds)
+
+    # Like the app, every consumer follows the player through one monitor, and the runner asks the player itself
+    # for the media time of each probe
+    monitor = PlayerMonitor(clock)
+    player.subscribe(monitor.publish)
+    runner = ProbeRunner(channel, player, monitor, video, is_demo, log, schedule, play_sound, on_alert,
+                         clock=clock, output_dir=output_dir)
+    label = TimeLabel(monitor, "%02d:%02d / %02d:%02d", lambda text: None)
+    runner.begin()
+    runner.execute()
+    player.play()
+
+    next_ui = None
+    while not runner.done():
+        with runner.cond:
+            timeout = runner.timeout()
+        candidates = [player.next_event(), keys[0][0] if keys else None, next_ui]
+        if timeout is not None:  # at least 1 us, or float rounding can keep the clock from moving
+            candidates.append(clock.monotonic() + max(timeout, 1e-6))
+        candidates = [c for c in candidates if c is not None]
+        if not candidates:
+            break
+        clock.advance_to(min(candidates))
+
+        player.advance()
+        while keys and keys[0][0] <= clock.monotonic():
+            key_time, answer = heapq.heappop(keys)
+            channel.put(clock.epoch + key_time, answer, key_time)
+        # UIUpdater: ticks on PLAYING and at every change of the displayed second, stops while paused
+        if not player.is_playing():
+            next_ui = None
+        elif next_ui is None or clock.monotonic() >= next_ui:
+            if label.ticks == 0:
+                label.start()
+            next_ui = clock.monotonic() + label.tick() / 1000
+        if not runner.done() and not runner.tick():
+            break
+    runner.end()
+
+    records, _ = probe_log.load_probe_log(runner.output_path)
+    sounds = records[records['kind'] == probe_log.SOUND]
+    jitter = np.asarray(sounds['value'])
+    onsets = (np.asarray(sounds['onset']) - np.asarray(sounds['time'])) * 1000
+    responses = np.asarray(runner.response_times)
+    return VideoReport(video, length, sum(1 for t in schedule.times if t < length), schedule.fired,
+                       schedule.skipped, len(responses),
+                       float(jitter.mean()) if len(jitter) else 0., float(jitter.max()) if len(jitter) else 0.,
+                       float(np.nanmean(onsets)) if len(onsets) else 0.,
+                       float(responses.mean()) if len(responses) else 0.,
+                       label.ticks, label.updates, label.lag.format())
+
+
+def simulate_session(videos, output_dir: str, user_id="0", policy=probe_schedule.FIXED, interval=40000,
+                     seed=None, **kwargs) -> List[VideoReport]:
+    """
+    :param videos: [(name, length in ms)], the first one is the demo video
+    :param kwargs: passed to simulate_video
+    :return: one VideoReport per video; probe_<video>.txt, probe_schedule_<video>.txt and simulation_log.txt are
+             written to `output_dir`
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    clock = VirtualClock(epoch=time.time())
+    participant = Participant(seed)
+    reports = []
+    with open(os.path.join(output_dir, "simulation_log.txt"), 'w', encoding='UTF-8') as output:
+        def log(string: str):
+            output.write("%f,%s\n" % (clock.time(), string))
+
+        for i, (video, length) in enumerate(videos):
+            schedule = probe_schedule.ProbeSchedule.build(policy, seed="%s,%s" % (user_id, video), length=length,
+                                                          interval=interval)
+            reports.append(simulate_video(clock, video, length, schedule, output_dir, participant, i == 0, log,
+                                          **kwargs))
+    return reports
+
+
+REPORT_HEADER = ("video,length_s,scheduled,fired,skipped,answered,jitter_mean_ms,jitter_max_ms,onset_mean_ms,"
+                 "response_mean_ms,label_ticks,label_updates,label_lag_mean_ms,label_lag_p95_ms,label_lag_max_ms")
+
+
+def format_report(report: VideoReport) -> str:
+    return "%s,%.1f,%d,%d,%d,%d,%.3f,%.3f,%.3f,%.3f,%d,%d,%s" % (
+        report.video, report.length / 1000, report.scheduled, report.fired, report.skipped, report.answered,
+        report.jitter_mean, report.jitter_max, report.onset_mean, report.response_mean, report.label_ticks,
+        report.label_updates, report.label_lag)
@@ -1,14 +1,51 @@
 import playsound
 
+from utils import audio
+
+_engine = None
+
+
+def init(urls, log=print):
+    """
+    Decode the given sound files once and keep an output stream open for them (see utils/audio.py).
+    Other files, or all of them if the engine is unavailable, are played with playsound.
+
+    :param urls: sound files to preload
+    :param log: called with "audioEngine,..." lines
+    """
+    global _engine
+    try:
+        engine = audio.AudioEngine()
+        for url in urls:
+            engine.load(url, url)
+        engine.start()
+    except Exception as e:
+        log("audioEngine,fallback,%s" % str(e).replace('\n', ' '))
+        return
+    _engine = engine
+    log("audioEngine,start,%d,%f" % (engine.rate, engine.stream.latency))
+
+
+def close(log=print):
+    global _engine
+    if _engine is None:
+        return
+    log("audioEngine,end,%s,%d" % (_engine.onset_latency.format(), _engine.underruns))
+    _engine.close()
+    _engine = None
+
 
 def play(url: str):
     """
     Try to execute sound file asynchronously as possible.
+    Preloaded files go through the audio engine; otherwise, playsound is used.
     Windows use winsound module since playsound module sometimes make EncodingError.
 
     :param url:
-    :return:
+    :return: audio.Playback for preloaded files (its onset is filled in when the sound starts), else None
     """
+    if _engine is not None and url in _engine.cues:
+        return _engine.play(url)
     try:
         playsound.playsound(url, False)
     except Exception as e:
@@ -17,3 +54,4 @@ def play(url: str):
             playsound.playsound(url, True)
         except Exception as e:
             print(e)
+    return None
@@ -0,0 +1,132 @@
+from threading import Lock
+import json
+import mmap
+import os
+
+import numpy as np
+import cv2
+
+from utils.segments import SegmentedWriter
+from utils.timeline import RecordWriter
+
+# Index record per spooled frame; the payload is `length` bytes at `offset` of the data file
+SPOOL_DTYPE = np.dtype([('frame', '<i8'), ('offset', '<i8'), ('length', '<i8'), ('time', '<f8')])
+
+
+class SpoolWriter:
+    """
+    Stores raw (or JPEG-compressed) frames in a memory-mapped file that is preallocated in `chunk_bytes` steps,
+    so the lecture only costs a memcpy per frame. Same write/rotate/release interface as SegmentedWriter;
+    `encode_spool` turns the spool into the usual segmented recording afterwards.
+
+    Files: <path> (frame data), <path>.idx (SPOOL_DTYPE records), <path>.json (shape, format, segment requests).
+    """
+
+    def __init__(self, path: str, shape, jpeg_quality: int = None, chunk_bytes=256 << 20):
+        self.path = path
+        self.shape = tuple(shape)
+        self.jpeg_quality = jpeg_quality
+        self.chunk_bytes = chunk_bytes
+        self.rotations = [[0, "start"]]
+        self.pending_reason = None
+        self.pending_lock = Lock()  # rotate() may be called from other threads
+
+        self.data = open(path, 'w+b')
+        self.mm = None
+        self.size = 0
+        self.offset = 0
+        self._grow(chunk_bytes)
+        self.index = RecordWriter(path + ".idx", SPOOL_DTYPE)
+        self._write_meta()
+
+    def _grow(self, min_bytes: int):
+        if self.mm is not None:
+            self.mm.close()
+        self.size += max(self.chunk_bytes, min_bytes)
+        self.data.truncate(self.size)
+        self.mm = mmap.mmap(self.data.fileno(), self.size)
+
+    def _write_meta(self):
+        with open(self.path + ".json", 'w', encoding='UTF-8') as f:
+            json.dump({"shape": self.shape, "jpeg": self.jpeg_quality is not None, "rotations": self.rotations}, f)
+
+    def isOpened(self):
+        return not self.data.closed
+
+    def rotate(self, reason: str):
+        """
+        Like SegmentedWriter.rotate(): safe to call from other threads, reasons before the same frame are joined.
+        """
+        with self.pending_lock:
+            self.pending_reason = reason if self.pending_reason is None else self.pending_reason + "+" + reason
+
+    def write(self, frame, frame_idx: int, timestamp: float):
+        if self.pending_reason is not None:
+            with self.pending_lock:
+                reason, self.pending_reason = self.pending_reason, None
+            self.rotations.append([frame_idx, reason])
+            self._write_meta()
+
+        if self.jpeg_quality is not None:
+            payload = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])[1].data
+        else:
+            payload = np.ascontiguousarray(frame).data
+        length = payload.nbytes
+        if self.offset + length > self.size:
+            self._grow(length)
+        self.mm[self.offset:self.offset + length] = payload
+        self.index.append(frame_idx, self.offset, length, timestamp)
+        self.offset += length
+
+    def release(self):
+        if self.data.closed:
+            return
+        self.index.close()
+        self.mm.flush()
+        self.mm.close()
+        self.data.truncate(self.offset)
+        self.data.close()
+        self._write_meta()
+
+
+def encode_spool(path: str, video_codec, prefix: str, fps: float, segment_seconds: float = None, progress=None):
+    """
+    Encode a spool into segmented video files (see SegmentedWriter) and delete the spool on success.
+    Meant to run in a background multiprocessing.Process.
+
+    :param progress: optional multiprocessing.Value('d') updated with the encoded fraction (0..1)
+    """
+    with open(path + ".json", encoding='UTF-8') as f:
+        meta = json.load(f)
+    shape = tuple(meta["shape"])
+    rotations = {frame: reason for frame, reason in meta["rotations"]}
+
+    if os.path.getsize(path + ".idx") < SPOOL_DTYPE.itemsize or os.path.getsize(path) == 0:
+        records = np.zeros(0, dtype=SPOOL_DTYPE)
+        data = np.zeros(0, dtype=np.uint8)
+    else:
+        records = np.memmap(path + ".idx", dtype=SPOOL_DTYPE, mode='r')
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+
+    writer = SegmentedWriter(video_codec, prefix, fps, (shape[1], shape[0]), segment_seconds)
+    for i, record in enumerate(records):
+        frame_idx, offset, length = int(record['frame']), int(record['offset']), int(record['length'])
+        if offset + length > len(data):
+            break  # spool truncated by a crash
+        if frame_idx in rotations:
+            writer.rotate(rotations[frame_idx])
+        payload = data[offset:offset + length]
+        if meta["jpeg"]:
+            frame = cv2.imdecode(payload, cv2.IMREAD_COLOR)
+        else:
+            frame = payload.reshape(shape)
+        writer.write(frame, frame_idx, float(record['time']))
+        if progress is not None and i % 30 == 0:
+            progress.value = i / len(records)
+    writer.release()
+    del records, data
+
+    for suffix in ("", ".idx", ".json"):
+        os.remove(path + suffix)
+    if progress is not None:
+        progress.value = 1.
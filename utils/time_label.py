@@ -0,0 +1,61 @@
+from utils.recorder_stats import LatencyStats
+
+
+def split_time(time_now: int, total: int):
+    """
+    :param time_now: position (s)
+    :param total: length (s)
+    :return: (minutes, seconds, total minutes, total seconds)
+    """
+    return time_now // 60, time_now % 60, total // 60, total % 60
+
+
+class TimeLabel:
+    """
+    Text of the lecture's time label from the player position, independent of Qt.
+    `set_text` is only called when the displayed text changes, and `tick()` says when the next change is due,
+    so the label can be driven by a single-shot timer instead of polling.
+
+    `lag` collects, for every change of the displayed second, how long (ms) after the media actually reached that
+    second the label showed it.
+    """
+
+    def __init__(self, player, time_text: str, set_text):
+        """
+        :param player: object with get_time() / get_length() (ms), e.g. vlc.MediaPlayer
+        :param time_text: format string for split_time()
+        """
+        self.player = player
+        self.time_text = time_text
+        self.set_text = set_text
+        self.total_length = 0
+        self.text = None
+        self.ticks = 0
+        self.updates = 0
+        self.lag = LatencyStats()
+
+    def start(self, length: int = None):
+        """
+        :param length: media length (ms), asked from the player if None
+        """
+        self.total_length = (self.player.get_length() if length is None else length) // 1000
+
+    def tick(self, margin=5, min_delay=50) -> int:
+        """
+        :param margin: (ms) wake up this long after the media reaches the next second
+        :param min_delay: (ms) lower bound of the returned delay, in case the player's time is stale
+        :return: (ms) delay until the displayed second changes, at normal playback speed
+        """
+        time_now = self.player.get_time()
+        text = self.time_text % split_time(int(time_now / 1000), self.total_length)
+        if text != self.text:
+            self.lag.add(time_now - int(time_now / 1000) * 1000)
+            self.set_text(text)
+            self.text = text
+            self.updates += 1
+        self.ticks += 1
+        return max(1000 - time_now % 1000 + margin, min_delay)
+
+    def reset(self):
+        self.text = self.time_text % (0, 0, 0, 0)
+        self.set_text(self.text)
@@ -0,0 +1,119 @@
+import glob
+import os
+
+import numpy as np
+
+# One fixed-size record per encoded frame. A trailing record with frame == -1 marks the end of recording.
+# capture: index among all frames the camera delivered, the ones dropped by the ring buffer included
+# (differs from frame when frames are dropped or decimated),
+# time / monotonic: clocks read right after the frame was grabbed,
+# pos_msec: the capture backend's own frame timestamp (CAP_PROP_POS_MSEC, NaN if unavailable),
+# crop_*: face crop box of the frame in face-ROI mode (crop_w == 0 otherwise),
+# full: whether the frame is also in the full-frame recording.
+TIMELINE_DTYPE = np.dtype([('frame', '<i8'), ('capture', '<i8'), ('time', '<f8'), ('monotonic', '<f8'), ('pos_msec', '<f8'),
+                           ('crop_x', '<i4'), ('crop_y', '<i4'), ('crop_w', '<i4'), ('crop_h', '<i4'),
+                           ('full', '<i4')])
+END_FRAME = -1
+
+
+class RecordWriter:
+    """
+    Append-only file of fixed-size numpy records, buffered in memory and written in blocks of `block_size`.
+    """
+
+    def __init__(self, path: str, dtype: np.dtype, block_size=256):
+        self.path = path
+        self.block = np.zeros(block_size, dtype=dtype)
+        self.count = 0
+        self.output = open(path, 'wb')
+
+    def append(self, *record):
+        self.block[self.count] = record
+        self.count += 1
+        if self.count == len(self.block):
+            self.flush()
+
+    def flush(self):
+        if self.count > 0:
+            self.output.write(self.block[:self.count].tobytes())
+            self.count = 0
+        self.output.flush()
+
+    def close(self):
+        if self.output.closed:
+            return
+        self.flush()
+        self.output.close()
+
+
+class TimelineWriter(RecordWriter):
+    """
+    Binary frame timeline, one `append` per encoded frame. Records reach the file at most `flush_interval`
+    seconds (of the frames' monotonic clock) after they were appended, so a crash loses little of the timeline.
+    """
+
+    def __init__(self, path: str, block_size=256, flush_interval=1.0):
+        super().__init__(path, TIMELINE_DTYPE, block_size)
+        self.flush_interval = flush_interval
+        self.flushed_at = None
+
+    def append(self, frame: int, timestamp: float, monotonic: float, pos_msec=float('nan'), crop=(0, 0, 0, 0),
+               full=True, capture=-1):
+        super().append(frame, capture, timestamp, monotonic, pos_msec, *crop, int(full))
+        if self.flushed_at is None:
+            self.flushed_at = monotonic
+        elif monotonic - self.flushed_at >= self.flush_interval:
+            self.flush()
+            self.flushed_at = monotonic
+
+    def close(self, timestamp: float = None, monotonic: float = 0.):
+        if self.output.closed:
+            return
+        if timestamp is not None:
+            self.append(END_FRAME, timestamp, monotonic, full=False)
+        super().close()
+
+
+def load_timeline(path: str):
+    """
+    Memory-map a binary timeline.
+
+    :param path: timeline written by TimelineWriter
+    :return: (records, end_time) where records is a read-only memmap of TIMELINE_DTYPE without the end marker
+             and any record cut short by an abnormal exit, and end_time is None if the recording did not end normally.
+    """
+    count = os.path.getsize(path) // TIMELINE_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=TIMELINE_DTYPE), None
+    records = np.memmap(path, dtype=TIMELINE_DTYPE, mode='r', shape=(count,))
+    if records[-1]['frame'] == END_FRAME:
+        return records[:-1], float(records[-1]['time'])
+    return records, None
+
+
+def to_text(path: str, text_path: str):
+    """
+    Convert a binary timeline to the legacy `video_timeline.txt` format ("%f" per frame, then "%f,end").
+    """
+    records, end_time = load_timeline(path)
+    with open(text_path, 'w', encoding='UTF-8') as output:
+        for start in range(0, len(records), 4096):
+            output.write(''.join("%f\n" % t for t in records['time'][start:start + 4096]))
+        if end_time is not None:
+            output.write("%f,end" % end_time)
+
+
+def convert_all(output_dir="./output"):
+    """
+    Write `video_timeline.txt` next to every binary timeline under `output_dir` that has none, e.g. after an
+    abnormal exit.
+
+    :return: paths of the text timelines written
+    """
+    converted = []
+    for path in sorted(glob.glob(os.path.join(output_dir, "**", "video_timeline.bin"), recursive=True)):
+        text_path = os.path.splitext(path)[0] + ".txt"
+        if not os.path.exists(text_path):
+            to_text(path, text_path)
+            converted.append(text_path)
+    return converted
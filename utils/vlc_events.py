@@ -0,0 +1,55 @@
+import ctypes
+
+from utils import vlc, player_events
+from utils.player_monitor import PlayerMonitor
+
+# utils/vlc.py declares libvlc_event_t without its payload union (only the first 4 bytes, as `meta_type`).
+# Time/length events carry a 64-bit libvlc_time_t there, so read it straight from the union's offset.
+_UNION_OFFSET = vlc.Event.meta_type.offset
+
+_KINDS = {
+    vlc.EventType.MediaPlayerPlaying.value: player_events.PLAYING,
+    vlc.EventType.MediaPlayerPaused.value: player_events.PAUSED,
+    vlc.EventType.MediaPlayerStopped.value: player_events.STOPPED,
+    vlc.EventType.MediaPlayerEndReached.value: player_events.ENDED,
+    vlc.EventType.MediaPlayerEncounteredError.value: player_events.ERROR,
+    vlc.EventType.MediaPlayerTimeChanged.value: player_events.TIME_CHANGED,
+    vlc.EventType.MediaPlayerLengthChanged.value: player_events.LENGTH_CHANGED,
+}
+PLAYER_EVENTS = tuple(vlc.EventType(k) for k in _KINDS)
+
+
+def event_int64(event: vlc.Event) -> int:
+    """
+    :param event: event passed to an EventManager callback
+    :return: new_time (MediaPlayerTimeChanged) or new_length (MediaPlayerLengthChanged) in ms
+    """
+    return ctypes.c_int64.from_address(ctypes.addressof(event) + _UNION_OFFSET).value
+
+
+class VLCPlayerMonitor(PlayerMonitor):
+    """
+    PlayerMonitor fed by the events of one vlc.MediaPlayer. Create it before the media starts, so the first
+    MediaPlayerPlaying is not missed.
+
+    Subscribers run on a VLC thread and must not call back into libvlc.
+    """
+
+    def __init__(self, player: vlc.MediaPlayer):
+        super().__init__()
+        self.player = player
+        # The wrapper owns the ctypes callback: keep it referenced as long as the player lives
+        self.event_manager = player.event_manager()
+        for event_type in PLAYER_EVENTS:
+            self.event_manager.event_attach(event_type, self.onEvent)
+
+    def onEvent(self, event):
+        kind = _KINDS[event.type]
+        value = event_int64(event) if kind in (player_events.TIME_CHANGED, player_events.LENGTH_CHANGED) else 0
+        self.publish(kind, value)
+
+    def get_length(self) -> int:
+        # Not every stream reports MediaPlayerLengthChanged before it plays: ask once (never from a callback)
+        if self.length <= 0:
+            self.length = self.player.get_length()
+        return self.length